@@ -0,0 +1,170 @@
+import itertools
+import math
+import threading
+import time
+from collections import Counter
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a model-backed request cannot be admitted; carries a Retry-After hint in seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Slot held by one admitted request, or a follower place; releasing it more than once is a no-op"""
+
+    def __init__(self, controller, client, following=False):
+        self._controller = controller
+        self._client = client
+        self._following = following
+        self._started = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        if self._following:
+            self._controller._release_follower()
+        else:
+            self._controller._release(self._client, time.monotonic() - self._started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """Bounds concurrent model-backed requests, queues a limited number of waiters and rejects the rest"""
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout=30.0, max_per_client=0, max_followers=32):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_followers = max(0, int(max_followers))
+        self.queue_timeout = queue_timeout
+        self.max_per_client = max_per_client
+        self._cond = threading.Condition()
+        self._active = 0
+        self._active_by_client = Counter()
+        self._waiting = []
+        # Requests waiting on an identical admitted request; they hold a server thread, never a slot or a queue place
+        self._following = 0
+        self._sequence = itertools.count()
+        # Exponentially weighted mean time a request holds its slot, for Retry-After
+        self._service_seconds = None
+        self.admitted = 0
+        self.rejected = Counter()
+
+    def acquire(self, client='anonymous', priority='normal'):
+        """Wait for a slot and return its ticket, or raise AdmissionRejected when the queue is full or too slow"""
+        with self._cond:
+            if self.max_per_client and self._client_load(client) >= self.max_per_client:
+                return self._reject('client_limit')
+            if self._active < self.max_concurrent and not self._waiting:
+                return self._grant(client)
+            if len(self._waiting) >= self.max_queue:
+                return self._reject('queue_full')
+
+            waiter = {
+                "priority": PRIORITIES.get(priority, PRIORITIES['normal']),
+                "sequence": next(self._sequence),
+                "client": client,
+                "granted": False
+            }
+            self._waiting.append(waiter)
+            deadline = time.monotonic() + self.queue_timeout
+            while not waiter["granted"]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(waiter)
+                    return self._reject('queue_timeout')
+                self._cond.wait(remaining)
+            return AdmissionTicket(self, client)
+
+    def follow(self):
+        """Follower place for a request that waits on an identical admitted one, or raise AdmissionRejected when full
+
+        Followers have their own limit so a burst of identical requests does not crowd distinct ones out of the queue.
+        """
+        with self._cond:
+            if self._following >= self.max_followers:
+                return self._reject('followers_full')
+            self._following += 1
+            return AdmissionTicket(self, None, following=True)
+
+    def _client_load(self, client):
+        # Caller holds the lock
+        return self._active_by_client[client] + sum(1 for waiter in self._waiting if waiter["client"] == client)
+
+    def _grant(self, client):
+        # Caller holds the lock
+        self._active += 1
+        self._active_by_client[client] += 1
+        self.admitted += 1
+        return AdmissionTicket(self, client)
+
+    def _reject(self, reason):
+        # Caller holds the lock
+        self.rejected[reason] += 1
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _release(self, client, held_seconds):
+        with self._cond:
+            self._active -= 1
+            self._active_by_client[client] -= 1
+            if self._active_by_client[client] <= 0:
+                del self._active_by_client[client]
+            if self._service_seconds is None:
+                self._service_seconds = held_seconds
+            else:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_seconds
+
+            # Highest priority first, then the client with the fewest running requests, then arrival order
+            while self._active < self.max_concurrent and self._waiting:
+                waiter = min(self._waiting, key=lambda w: (w["priority"], self._active_by_client[w["client"]], w["sequence"]))
+                self._waiting.remove(waiter)
+                waiter["granted"] = True
+                self._active += 1
+                self._active_by_client[waiter["client"]] += 1
+                self.admitted += 1
+            self._cond.notify_all()
+
+    def _release_follower(self):
+        with self._cond:
+            self._following -= 1
+
+    def retry_after(self):
+        """Seconds until the current queue is expected to drain"""
+        service_seconds = self._service_seconds or 1.0
+        return max(1, math.ceil(service_seconds * (len(self._waiting) + 1) / self.max_concurrent))
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def queue_depth(self):
+        return len(self._waiting)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": len(self._waiting),
+                "following": self._following,
+                "maxConcurrent": self.max_concurrent,
+                "maxQueue": self.max_queue,
+                "maxFollowers": self.max_followers,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected)
+            }
@@ -1,27 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import torch
-from transformers import T5ForConditionalGeneration, T5Tokenizer, pipeline
 import random
 import re
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.tag import pos_tag
 import logging
 import json
-from collections import Counter
+import os
 import string
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('averaged_perceptron_tagger')
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from collections import namedtuple
+from concurrent.futures import Future, as_completed, wait, TimeoutError as FuturesTimeoutError
+import time
+import threading
+from startup import StartupState, load_nltk_resources, model_load_kwargs
+from generation_scheduler import GenerationScheduler
+from text_analysis import TextAnalysis, TextAnalysisCache, content_hash
+from nlp_backends import NlpProcessPool, create_nlp_backend, merge_tagged
+from generation_cache import GenerationCache, generation_cache_key
+from jobs import JobDispatcher, JobStore
+from admission import AdmissionController, AdmissionRejected
+from request_coalescing import COMPUTED, RequestCoalescer, request_key
+from performance_analytics import PerformanceAggregateStore, analyze_attempts
+from quiz_bank import QuizBank
+from inference_backends import prepare_model
+from distractors import DistractorEngine
+from question_planner import AnswerPlanner, NearDuplicateFilter
+from tokenization import QuestionInputEncoder, load_tokenizer
+from metrics import MetricsRegistry, begin_request_timings, request_timings
+from latency_budget import DecodingLatencyTracker, GenerationBudget, QUALITY_TIERS
 
 app = Flask(__name__)
 CORS(app)
@@ -33,105 +39,486 @@ logger = logging.getLogger(__name__)
 # Global variables for models
 question_generator = None
 tokenizer = None
-stop_words = set(stopwords.words('english'))
+question_encoder = None
+inference_context = nullcontext
+stop_words = set()
+nlp_backend = None
+nlp_pool = None
+startup_state = StartupState()
+
+# Startup: torch, transformers and NLTK data are only loaded by load_models, never at import time
+# unless a WSGI server without startup hooks opts in with T5_LOAD_ON_IMPORT=1
+T5_LOAD_ON_IMPORT = os.environ.get('T5_LOAD_ON_IMPORT', '0') == '1'
+T5_MODEL_DIR = os.environ.get('T5_MODEL_DIR')
+T5_WARMUP = os.environ.get('T5_WARMUP', '1') == '1'
+NLTK_DATA_DIR = os.environ.get(
+    'NLTK_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+)
+NLTK_ALLOW_DOWNLOAD = os.environ.get('NLTK_ALLOW_DOWNLOAD', '1') == '1'
+
+# T5 checkpoint and decoding parameters
+T5_MODEL_NAME = os.environ.get('T5_MODEL_NAME', "iarfmoose/t5-base-question-generator")
+
+# CPU inference backend: fp32, int8 (dynamic quantization), bf16 (autocast) or compile (torch.compile)
+T5_INFERENCE_BACKEND = os.environ.get('T5_INFERENCE_BACKEND', 'fp32')
+
+# Quantized or reduced-precision models can word questions differently, so they get their own cache entries
+T5_CACHE_MODEL_ID = T5_MODEL_NAME if T5_INFERENCE_BACKEND == 'fp32' else f"{T5_MODEL_NAME}@{T5_INFERENCE_BACKEND}"
+T5_GENERATION_KWARGS = {
+    "max_length": 64,
+    "num_beams": 4,
+    "early_stopping": True,
+    "no_repeat_ngram_size": 2,
+    "temperature": 0.7,
+    "do_sample": True
+}
+
+# Cheaper decoding strategies chosen when a request's latency budget cannot afford the full beam search
+T5_DECODING_STRATEGIES = {
+    "full": T5_GENERATION_KWARGS,
+    "small_beam": {
+        "max_length": 64,
+        "num_beams": 2,
+        "early_stopping": True,
+        "no_repeat_ngram_size": 2
+    },
+    "greedy": {
+        "max_length": 64,
+        "num_beams": 1,
+        "no_repeat_ngram_size": 2
+    },
+    # Full beam search without sampling, used instead of "full" by requests that pass a seed
+    "full_beam": {
+        "max_length": 64,
+        "num_beams": 4,
+        "early_stopping": True,
+        "no_repeat_ngram_size": 2
+    }
+}
+decoding_latency = DecodingLatencyTracker()
+
+# Number of tokenized context prefixes kept so each context is only encoded once
+T5_PREFIX_CACHE_SIZE = int(os.environ.get('T5_PREFIX_CACHE_SIZE', 256))
+
+# Maximum number of (context, answer) pairs sent through one generate() call
+T5_MAX_BATCH_SIZE = int(os.environ.get('T5_MAX_BATCH_SIZE', 8))
+
+# Cross-request micro-batching of T5 generation jobs
+T5_SCHEDULER_ENABLED = os.environ.get('T5_SCHEDULER_ENABLED', '1') == '1'
+T5_SCHEDULER_MAX_BATCH_SIZE = int(os.environ.get('T5_SCHEDULER_MAX_BATCH_SIZE', T5_MAX_BATCH_SIZE))
+T5_SCHEDULER_MAX_WAIT_MS = float(os.environ.get('T5_SCHEDULER_MAX_WAIT_MS', 10))
+generation_scheduler = None
+
+# Bulk generation jobs are kept in SQLite, so any web worker can answer for them, and run by one
+# dispatcher on a pool of worker processes that each preload T5
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1))
+JOB_MAX_IN_FLIGHT = int(os.environ.get('JOB_MAX_IN_FLIGHT', JOB_WORKERS * 2))
+JOB_MAX_ITEMS = int(os.environ.get('JOB_MAX_ITEMS', 1000))
+JOB_MAX_QUESTION_COUNT = int(os.environ.get('JOB_MAX_QUESTION_COUNT', 50))
+JOB_MAX_RETAINED = int(os.environ.get('JOB_MAX_RETAINED', 100))
+JOB_STORE_PATH = os.environ.get(
+    'JOB_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.sqlite3')
+)
+# local: this process runs the dispatcher; external: a separate process does (gunicorn.conf.py starts one)
+JOB_DISPATCHER = os.environ.get('JOB_DISPATCHER', 'local')
+job_dispatcher_options = {
+    "workers": JOB_WORKERS,
+    "max_in_flight": JOB_MAX_IN_FLIGHT,
+    "torch_threads": int(os.environ.get('JOB_TORCH_THREADS', 0)) or None,
+    "start_method": os.environ.get('JOB_START_METHOD', 'spawn')
+}
+job_store = JobStore(JOB_STORE_PATH, max_retained=JOB_MAX_RETAINED)
+job_dispatcher = JobDispatcher(job_store, **job_dispatcher_options) if JOB_DISPATCHER == 'local' else None
+
+# Single-pass NLP analysis shared by every stage, cached by paragraph content hash
+TEXT_ANALYSIS_CACHE_SIZE = int(os.environ.get('TEXT_ANALYSIS_CACHE_SIZE', 128))
+text_analysis_cache = TextAnalysisCache(TEXT_ANALYSIS_CACHE_SIZE)
+
+# Tokenization and POS tagging backend (nltk or spacy); large multi-paragraph inputs can be tagged by a process pool
+NLP_BACKEND = os.environ.get('NLP_BACKEND', 'nltk')
+NLP_SPACY_MODEL = os.environ.get('NLP_SPACY_MODEL', 'en_core_web_sm')
+NLP_BATCH_SIZE = int(os.environ.get('NLP_BATCH_SIZE', 64))
+NLP_PROCESSES = int(os.environ.get('NLP_PROCESSES', 1))
+NLP_PARALLEL_MIN_CHARS = int(os.environ.get('NLP_PARALLEL_MIN_CHARS', 20000))
+
+# Generation context is the sentence window around each answer instead of the whole paragraph
+CONTEXT_WINDOW_WORDS = int(os.environ.get('CONTEXT_WINDOW_WORDS', 200))
+CONTEXT_WINDOW_OVERLAP = int(os.environ.get('CONTEXT_WINDOW_OVERLAP', 1))
+
+# Word-shingle Jaccard similarity above which a generated question counts as a near-duplicate
+QUESTION_DUPLICATE_THRESHOLD = float(os.environ.get('QUESTION_DUPLICATE_THRESHOLD', 0.6))
+
+# Content-addressed cache of generated questions, shared by workers through SQLite
+GENERATION_CACHE_ENABLED = os.environ.get('GENERATION_CACHE_ENABLED', '1') == '1'
+GENERATION_CACHE_PATH = os.environ.get(
+    'GENERATION_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generation_cache.sqlite3')
+)
+GENERATION_CACHE_MEMORY_BYTES = int(os.environ.get('GENERATION_CACHE_MEMORY_BYTES', 8 * 1024 * 1024))
+GENERATION_CACHE_MAX_DISK_ENTRIES = int(os.environ.get('GENERATION_CACHE_MAX_DISK_ENTRIES', 100000))
+generation_cache = GenerationCache(
+    GENERATION_CACHE_PATH,
+    max_memory_bytes=GENERATION_CACHE_MEMORY_BYTES,
+    max_disk_entries=GENERATION_CACHE_MAX_DISK_ENTRIES
+) if GENERATION_CACHE_ENABLED else None
+
+# Batch performance analytics and the running per-cohort aggregates behind the dashboards
+PERFORMANCE_BATCH_MAX_ATTEMPTS = int(os.environ.get('PERFORMANCE_BATCH_MAX_ATTEMPTS', 50000))
+PERFORMANCE_STORE_PATH = os.environ.get(
+    'PERFORMANCE_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'performance_aggregates.sqlite3')
+)
+performance_store = PerformanceAggregateStore(PERFORMANCE_STORE_PATH)
+
+# Random source of the current request; a Random seeded from the request's seed, or the module RNG
+request_random = ContextVar('request_random', default=None)
+
+# Pregenerated questions served before falling back to live generation; built offline with quiz_bank.py
+QUIZ_BANK_PATH = os.environ.get('QUIZ_BANK_PATH', '')
+quiz_bank = QuizBank(QUIZ_BANK_PATH) if QUIZ_BANK_PATH else None
+
+# Admission control for model-backed routes; cheap routes are never queued behind T5 work
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 2))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 8))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 30))
+ADMISSION_MAX_PER_CLIENT = int(os.environ.get('ADMISSION_MAX_PER_CLIENT', 0))
+ADMISSION_MAX_FOLLOWERS = int(os.environ.get('ADMISSION_MAX_FOLLOWERS', 32))
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    max_per_client=ADMISSION_MAX_PER_CLIENT,
+    max_followers=ADMISSION_MAX_FOLLOWERS
+) if ADMISSION_ENABLED else None
+
+# Identical concurrent /generate-quiz requests share one generation, and finished quizzes are kept briefly.
+# Waiting copies take a follower place, not a queue place, and give up like queued requests do
+QUIZ_COALESCING_ENABLED = os.environ.get('QUIZ_COALESCING_ENABLED', '1') == '1'
+QUIZ_RESPONSE_CACHE_TTL = float(os.environ.get('QUIZ_RESPONSE_CACHE_TTL', 30))
+QUIZ_RESPONSE_CACHE_SIZE = int(os.environ.get('QUIZ_RESPONSE_CACHE_SIZE', 256))
+quiz_coalescer = RequestCoalescer(
+    ttl_seconds=QUIZ_RESPONSE_CACHE_TTL,
+    max_entries=QUIZ_RESPONSE_CACHE_SIZE,
+    wait_timeout=ADMISSION_QUEUE_TIMEOUT
+) if QUIZ_COALESCING_ENABLED else None
+
+# In-process metrics served in the Prometheus text format on /metrics
+DEBUG_TIMING_HEADER = os.environ.get('DEBUG_TIMING_HEADER', 'X-Debug-Timing')
+metrics = MetricsRegistry()
+metrics.histogram('quiz_stage_seconds', "Time spent in each quiz generation stage")
+metrics.histogram('http_request_seconds', "Request handling time by endpoint")
+metrics.counter('http_requests_total', "Requests handled by endpoint and status")
+metrics.gauge('http_requests_in_flight', "Requests currently being handled")
+metrics.counter('t5_generate_calls_total', "Batched T5 generate() calls")
+metrics.counter('t5_generated_questions_total', "Questions decoded by T5")
+metrics.counter('t5_generated_tokens_total', "Tokens decoded by T5; divide by the generate stage time for tokens per second")
+metrics.counter('quiz_questions_total', "Questions returned to clients by source (model, template fallback or quiz bank)")
+metrics.counter('quiz_model_calls_saved_total', "Generations avoided by sharing one generation between repeated answers")
+metrics.counter('quiz_bank_lookups_total', "Quiz bank lookups by route kind and result")
+metrics.gauge('model_ready', "Whether models are loaded and warmed up", lambda: int(startup_state.is_ready))
+metrics.gauge('admission_active_requests', "Model-backed requests holding an admission slot",
+              lambda: admission.active if admission else None)
+metrics.gauge('admission_queue_depth', "Model-backed requests waiting for an admission slot",
+              lambda: admission.queue_depth if admission else None)
+metrics.gauge('admission_rejected_total', "Model-backed requests rejected with 429 by reason",
+              lambda: {(('reason', reason),): count for reason, count in admission.rejected.items()} if admission else None,
+              metric_type='counter')
+metrics.gauge('scheduler_queue_depth', "Generation jobs waiting for the shared inference worker",
+              lambda: generation_scheduler.queue_depth if generation_scheduler else 0)
+
+def cache_lookup_metrics():
+    """Hit and miss counts of the generation cache as labelled counter values"""
+    if generation_cache is None:
+        return None
+    stats = generation_cache.stats()
+    return {
+        (('result', 'memory_hit'),): stats['memory_hits'],
+        (('result', 'disk_hit'),): stats['disk_hits'],
+        (('result', 'miss'),): stats['misses']
+    }
+
+def prefix_cache_metrics():
+    """Hit and miss counts of the tokenized context prefix cache as labelled counter values"""
+    if question_encoder is None:
+        return None
+    stats = question_encoder.stats()
+    return {(('result', 'hit'),): stats['prefixHits'], (('result', 'miss'),): stats['prefixMisses']}
+
+def coalescing_metrics():
+    """Paragraph quiz requests by whether they ran the pipeline, waited on an identical one or hit the response cache"""
+    if quiz_coalescer is None:
+        return None
+    stats = quiz_coalescer.stats()
+    return {
+        (('outcome', 'computed'),): stats['computed'],
+        (('outcome', 'coalesced'),): stats['coalesced'],
+        (('outcome', 'hit'),): stats['hits']
+    }
 
-def load_models():
+metrics.gauge('quiz_coalesced_requests_total', "Paragraph quiz requests by outcome", coalescing_metrics, metric_type='counter')
+metrics.gauge('generation_cache_lookups_total', "Generation cache lookups by result", cache_lookup_metrics, metric_type='counter')
+metrics.gauge('t5_prefix_cache_lookups_total', "Tokenized context prefix cache lookups by result", prefix_cache_metrics, metric_type='counter')
+metrics.gauge('text_analysis_cache_lookups_total', "Paragraph analysis cache lookups by result", lambda: {
+    (('result', 'hit'),): text_analysis_cache.hits,
+    (('result', 'miss'),): text_analysis_cache.misses
+}, metric_type='counter')
+
+def load_nltk():
+    """Load the NLTK data used by text analysis from the configured directory, then the NLP backend"""
+    global stop_words, nlp_backend, nlp_pool
+    stop_words = load_nltk_resources(NLTK_DATA_DIR, allow_download=NLTK_ALLOW_DOWNLOAD)
+    options = {"data_dir": NLTK_DATA_DIR, "model": NLP_SPACY_MODEL}
+    nlp_backend = create_nlp_backend(NLP_BACKEND, **options)
+    if NLP_PROCESSES > 1 and nlp_pool is None:
+        nlp_pool = NlpProcessPool(NLP_BACKEND, options, NLP_PROCESSES, batch_size=NLP_BATCH_SIZE)
+
+def load_models(start_scheduler=None, warmup=None):
     """Load the T5 model and other ML components"""
-    global question_generator, tokenizer
+    global question_generator, tokenizer, question_encoder, inference_context
     try:
-        logger.info("Loading T5 question generation model...")
-        model_name = "iarfmoose/t5-base-question-generator"
-        tokenizer = T5Tokenizer.from_pretrained(model_name)
-        question_generator = T5ForConditionalGeneration.from_pretrained(model_name)
-        logger.info("Models loaded successfully!")
+        startup_state.begin("loading_nltk")
+        load_nltk()
+        
+        startup_state.begin("importing_torch")
+        from transformers import T5ForConditionalGeneration
+        
+        startup_state.begin("loading_model")
+        model_name = T5_MODEL_DIR or T5_MODEL_NAME
+        logger.info(f"Loading T5 question generation model from {model_name}...")
+        load_kwargs = model_load_kwargs(model_name)
+        tokenizer = load_tokenizer(model_name, **load_kwargs)
+        question_encoder = QuestionInputEncoder(tokenizer, max_length=512, cache_size=T5_PREFIX_CACHE_SIZE)
+        question_generator, inference_context = prepare_model(
+            T5ForConditionalGeneration.from_pretrained(model_name, **load_kwargs),
+            T5_INFERENCE_BACKEND
+        )
+        logger.info(f"Models loaded successfully with the {T5_INFERENCE_BACKEND} inference backend!")
+        
+        if T5_WARMUP if warmup is None else warmup:
+            startup_state.begin("warming_up")
+            warm_up()
+        
+        if T5_SCHEDULER_ENABLED if start_scheduler is None else start_scheduler:
+            start_generation_scheduler()
+        startup_state.ready()
     except Exception as e:
+        startup_state.fail(e)
         logger.error(f"Error loading models: {str(e)}")
         raise e
 
-def extract_key_entities(text):
+def warm_up():
+    """Run one NLP pass and one generation so the first request does not pay lazy initialization"""
+    sample = "Warm-up passage about the water cycle. Water evaporates from the ocean and falls again as rain."
+    get_distractor_engine(build_text_analysis(sample))
+    generate_questions_batch_with_t5([(sample, "rain")], strategy="greedy")
+
+def start_background_loading():
+    """Load models on a background thread so the server can answer liveness probes meanwhile"""
+    def run():
+        try:
+            load_models()
+        except Exception:
+            pass
+    threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+def start_generation_scheduler():
+    """Start the shared inference worker that batches generation jobs across requests"""
+    global generation_scheduler
+    if generation_scheduler is None:
+        generation_scheduler = GenerationScheduler(
+            run_scheduled_batch,
+            max_batch_size=T5_SCHEDULER_MAX_BATCH_SIZE,
+            max_wait_ms=T5_SCHEDULER_MAX_WAIT_MS
+        )
+    generation_scheduler.start()
+
+def build_text_analysis(text, tagged=None):
+    """Run the NLP backend over a paragraph (unless already tagged) and derive its analysis"""
+    if tagged is None and nlp_backend is not None:
+        tagged = tag_document(text)
+    return TextAnalysis(
+        text,
+        stop_words,
+        window_words=CONTEXT_WINDOW_WORDS,
+        window_overlap=CONTEXT_WINDOW_OVERLAP,
+        tagged=tagged
+    )
+
+def tag_document(text):
+    """Tag one document, spreading a large multi-paragraph input over the NLP process pool"""
+    if nlp_pool is not None and len(text) >= NLP_PARALLEL_MIN_CHARS:
+        blocks = [block for block in re.split(r'\n\s*\n', text) if block.strip()]
+        if len(blocks) > 1:
+            return merge_tagged(nlp_pool.tag(blocks))
+    return nlp_backend.tag_one(text)
+
+def tag_documents(texts):
+    """Tag many documents in nlp.pipe-style batches, on the process pool when one is configured"""
+    if nlp_pool is not None and len(texts) > 1:
+        return nlp_pool.tag(texts)
+    return list(nlp_backend.tag(texts, NLP_BATCH_SIZE))
+
+def analyze_text(text):
+    """Return the shared single-pass NLP analysis of a paragraph"""
+    with metrics.stage('analysis'):
+        return text_analysis_cache.get(text, lambda: build_text_analysis(text))
+
+def analyze_texts(texts):
+    """Return the analyses of many paragraphs, tagging every uncached one in a single batch"""
+    def build_many(missing):
+        tagged = tag_documents(missing) if nlp_backend is not None else [None] * len(missing)
+        return [build_text_analysis(text, tagged=item) for text, item in zip(missing, tagged)]
+    
+    with metrics.stage('analysis'):
+        return text_analysis_cache.get_many(list(texts), build_many)
+
+def extract_key_entities(text, analysis=None):
     """Extract key entities and important phrases from text using NLP"""
-    # Tokenize and get POS tags
-    tokens = word_tokenize(text)
-    pos_tags = pos_tag(tokens)
-    
-    # Extract nouns, proper nouns, and adjectives
-    important_words = []
-    for word, pos in pos_tags:
-        if (pos.startswith('NN') or pos.startswith('JJ') or pos.startswith('VB')) and \
-           word.lower() not in stop_words and \
-           len(word) > 2 and \
-           word.isalpha():
-            important_words.append(word)
-    
-    # Get most frequent important words
-    word_freq = Counter(important_words)
-    key_entities = [word for word, freq in word_freq.most_common(15)]
-    
-    # Extract noun phrases
-    noun_phrases = []
-    i = 0
-    while i < len(pos_tags):
-        phrase = []
-        # Look for adjective + noun or noun + noun patterns
-        while i < len(pos_tags) and (pos_tags[i][1].startswith('JJ') or pos_tags[i][1].startswith('NN')):
-            if pos_tags[i][0].lower() not in stop_words and pos_tags[i][0].isalpha():
-                phrase.append(pos_tags[i][0])
-            i += 1
-        if len(phrase) >= 2:
-            noun_phrases.append(' '.join(phrase))
-        i += 1
-    
-    return key_entities, noun_phrases
+    analysis = analysis or analyze_text(text)
+    return list(analysis.key_entities), list(analysis.noun_phrases)
 
 def generate_question_with_t5(context, answer):
     """Generate a question using T5 model"""
-    try:
-        # Prepare input for T5
-        input_text = f"context: {context} answer: {answer}"
-        input_ids = tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
-        
-        # Generate question
-        with torch.no_grad():
-            outputs = question_generator.generate(
-                input_ids,
-                max_length=64,
-                num_beams=4,
-                early_stopping=True,
-                no_repeat_ngram_size=2,
-                temperature=0.7,
-                do_sample=True
-            )
+    return generate_questions([(context, answer)])[0]
+
+def generate_questions_batch_with_t5(pairs, max_batch_size=None, strategy="full", deadline=None):
+    """Generate questions for many (context, answer) pairs using padded, batched T5 calls"""
+    import torch
+    batch_size = max(1, max_batch_size or T5_MAX_BATCH_SIZE)
+    generation_kwargs = T5_DECODING_STRATEGIES[strategy]
+    questions = [None] * len(pairs)
+    
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
         
-        question = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        # Stop dispatching once the next batch would overrun the request deadline
+        if deadline is not None and time.monotonic() + decoding_latency.seconds_per_question(strategy) * len(batch) > deadline:
+            logger.info(f"Deadline reached, skipping T5 generation for {len(pairs) - start} questions")
+            break
         
-        # Clean up the question
-        question = question.strip()
-        if not question.endswith('?'):
-            question += '?'
+        try:
+            # Prepare padded input for T5 from cached context ids and per-answer ids
+            with metrics.stage('tokenize'):
+                input_ids, attention_mask = question_encoder.encode_batch(batch)
             
-        return question
-    except Exception as e:
-        logger.error(f"Error generating question with T5: {str(e)}")
-        return None
+            # Generate one question per input row
+            generation_start = time.monotonic()
+            with metrics.stage('generate'), torch.no_grad(), inference_context():
+                outputs = question_generator.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    **generation_kwargs
+                )
+            decoding_latency.record(strategy, time.monotonic() - generation_start, len(batch), outputs.shape[1] - 1)
+            metrics.inc('t5_generate_calls_total', strategy=strategy)
+            metrics.inc('t5_generated_questions_total', len(batch), strategy=strategy)
+            # Decoder rows start with the pad token and are padded after EOS
+            metrics.inc('t5_generated_tokens_total', int((outputs[:, 1:] != tokenizer.pad_token_id).sum()), strategy=strategy)
+            
+            for offset, question in enumerate(tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                # Clean up the question
+                question = question.strip()
+                if not question.endswith('?'):
+                    question += '?'
+                questions[start + offset] = question
+        except Exception as e:
+            logger.error(f"Error generating question batch with T5: {str(e)}")
+    
+    return questions
 
-def generate_smart_distractors(correct_answer, context, key_entities, noun_phrases):
-    """Generate intelligent distractors based on context analysis"""
-    distractors = []
+def generate_questions(pairs, strategy="full", deadline=None):
+    """Generate questions for (context, answer) pairs, serving repeats from the generation cache"""
+    futures, pending_writes = submit_questions(pairs, strategy, deadline)
+    if deadline is None:
+        questions = [future.result() for future in futures]
+    else:
+        # Questions that are not ready by the deadline are left to the template fallback
+        done, not_done = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        for future in not_done:
+            future.cancel()
+        questions = [future.result() if future in done else None for future in futures]
     
-    # Type 1: Use other key entities from the text
-    context_entities = [entity for entity in key_entities if entity.lower() != correct_answer.lower()]
-    if context_entities:
-        distractors.extend(random.sample(context_entities, min(2, len(context_entities))))
+    store_generated_questions(pending_writes)
+    return questions
+
+def submit_questions(pairs, strategy="full", deadline=None):
+    """Start generating questions for (context, answer) pairs; returns one future per pair and the (key, future) cache misses"""
+    if not pairs:
+        return [], []
+    if generation_cache is None:
+        return run_t5_generation(pairs, strategy, deadline), []
+    
+    generation_kwargs = T5_DECODING_STRATEGIES[strategy]
+    keys = [generation_cache_key(context, answer, T5_CACHE_MODEL_ID, generation_kwargs) for context, answer in pairs]
+    cached = generation_cache.get_many(keys)
+    futures = [None] * len(pairs)
+    for i, key in enumerate(keys):
+        if key in cached:
+            futures[i] = Future()
+            futures[i].set_result(cached[key])
+    
+    # Only pay model cost for the pairs that missed
+    pending = [i for i, key in enumerate(keys) if key not in cached]
+    pending_writes = []
+    for i, future in zip(pending, run_t5_generation([pairs[i] for i in pending], strategy, deadline)):
+        pending_writes.append((keys[i], future))
+        futures[i] = future
+    
+    return futures, pending_writes
+
+def store_generated_questions(pending_writes):
+    """Write the finished generations of one request into the cache in a single transaction"""
+    # Runs on the request thread once it stops waiting, never on the shared inference worker
+    finished = [
+        (key, future.result()) for key, future in pending_writes
+        if future.done() and not future.cancelled() and future.exception() is None
+    ]
+    if finished:
+        generation_cache.put_many(finished)
+
+def run_t5_generation(pairs, strategy="full", deadline=None):
+    """Run T5 on (context, answer) pairs, through the shared scheduler when it is running"""
+    if not pairs:
+        return []
+    if generation_scheduler is not None:
+        return generation_scheduler.submit(pairs, strategy)
+    
+    futures = []
+    for question in generate_questions_batch_with_t5(pairs, strategy=strategy, deadline=deadline):
+        future = Future()
+        future.set_result(question)
+        futures.append(future)
+    return futures
+
+def run_scheduled_batch(pairs, strategy):
+    """Generation function of the shared scheduler, called with one batch of same-strategy jobs"""
+    return generate_questions_batch_with_t5(pairs, T5_SCHEDULER_MAX_BATCH_SIZE, strategy or "full")
+
+def get_distractor_engine(analysis):
+    """TF-IDF distractor index of a paragraph, built once from its noun phrases and key entities"""
+    if analysis.distractor_engine is None:
+        analysis.distractor_engine = DistractorEngine(analysis.noun_phrases + analysis.key_entities)
+    return analysis.distractor_engine
+
+def generate_smart_distractors(correct_answer, context, key_entities, noun_phrases, analysis=None, candidates=None):
+    """Generate intelligent distractors based on context analysis"""
+    analysis = analysis or analyze_text(context)
     
-    # Type 2: Use noun phrases
-    relevant_phrases = [phrase for phrase in noun_phrases if correct_answer.lower() not in phrase.lower()]
-    if relevant_phrases:
-        distractors.extend(random.sample(relevant_phrases, min(1, len(relevant_phrases))))
+    # Type 1: Entities and noun phrases most similar to the answer, precomputed for the whole quiz when given
+    if candidates is None:
+        candidates = get_distractor_engine(analysis).distractors_for([correct_answer])[0]
+    distractors = list(candidates[:3])
+    used = {correct_answer.lower()} | {d.lower() for d in distractors}
     
-    # Type 3: Generate semantic distractors based on answer type
+    # Type 2: Generate semantic distractors based on answer type
     if len(distractors) < 3:
-        semantic_distractors = generate_semantic_distractors(correct_answer, context)
-        distractors.extend(semantic_distractors)
+        for word in generate_semantic_distractors(correct_answer, context, analysis):
+            if len(distractors) < 3 and word.lower() not in used:
+                distractors.append(word)
+                used.add(word.lower())
     
     # Ensure we have exactly 3 distractors
     while len(distractors) < 3:
@@ -143,71 +530,62 @@ def generate_smart_distractors(correct_answer, context, key_entities, noun_phras
         ]
         available_generic = [d for d in generic_distractors if d not in distractors]
         if available_generic:
-            distractors.append(random.choice(available_generic))
+            distractors.append(quiz_random().choice(available_generic))
         else:
             distractors.append(f"Alternative option {len(distractors) + 1}")
     
     return distractors[:3]
 
-def generate_semantic_distractors(correct_answer, context):
+def generate_semantic_distractors(correct_answer, context, analysis=None):
     """Generate semantically related but incorrect distractors"""
     # Simple semantic distractor generation
     # In a production system, you might use word embeddings or knowledge graphs
     
-    words = re.findall(r'\b[a-zA-Z]{3,}\b', context)
-    words = [w for w in words if w.lower() != correct_answer.lower() and w.lower() not in stop_words]
+    analysis = analysis or analyze_text(context)
+    words = analysis.words_excluding(correct_answer)
     
     if len(words) >= 2:
-        return random.sample(words, min(2, len(words)))
+        return quiz_random().sample(words, min(2, len(words)))
     else:
         return ["Alternative concept", "Different approach"]
 
-def analyze_text_complexity(text):
+def analyze_text_complexity(text, analysis=None):
     """Analyze text to determine appropriate question difficulty"""
-    sentences = sent_tokenize(text)
-    words = word_tokenize(text)
-    
-    # Calculate metrics
-    avg_sentence_length = len(words) / len(sentences) if sentences else 0
-    unique_words = len(set(word.lower() for word in words if word.isalpha()))
-    total_words = len([word for word in words if word.isalpha()])
-    lexical_diversity = unique_words / total_words if total_words > 0 else 0
-    
-    # Determine difficulty
-    if avg_sentence_length > 20 and lexical_diversity > 0.7:
-        return "hard"
-    elif avg_sentence_length > 15 and lexical_diversity > 0.5:
-        return "medium"
-    else:
-        return "easy"
+    analysis = analysis or analyze_text(text)
+    return analysis.difficulty
 
-def create_comprehensive_questions(text, key_entities, noun_phrases, question_count):
-    """Create different types of questions for comprehensive assessment"""
-    questions = []
-    sentences = sent_tokenize(text)
-    difficulty = analyze_text_complexity(text)
+# One planned question: T5 generates the question from `context`, template slots carry it in `question`
+QuestionSlot = namedtuple('QuestionSlot', ['question_type', 'answer', 'question', 'context'])
+
+def plan_question_slots(text, key_entities, noun_phrases, question_count, analysis, planner=None):
+    """Choose the type and answer of every question before any model call"""
+    sentences = analysis.sentences
+    planner = planner or AnswerPlanner(analysis)
     
     # Question type distribution
     question_types = ['factual', 'inference', 'main_idea', 'detail', 'vocabulary']
     
+    slots = []
     for i in range(question_count):
         question_type = question_types[i % len(question_types)]
+        question = None
+        use_t5 = False
         
         if question_type == 'factual' and key_entities:
             # Factual questions about key entities
-            answer = random.choice(key_entities)
-            question = generate_question_with_t5(text, answer)
+            answer = planner.take('entity')
+            use_t5 = True
             
         elif question_type == 'inference':
             # Inference questions
             if len(sentences) >= 2:
-                context_sentence = random.choice(sentences)
+                context_sentence = planner.take_sentence()
                 # Create inference-based answer
                 answer = "can be inferred from the context"
                 question = f"What can be inferred from the statement: '{context_sentence[:100]}...'?"
             else:
-                answer = random.choice(key_entities) if key_entities else "main concept"
-                question = generate_question_with_t5(text, answer)
+                answer = planner.take('entity') if key_entities else "main concept"
+                use_t5 = True
                 
         elif question_type == 'main_idea':
             # Main idea questions
@@ -217,114 +595,628 @@ def create_comprehensive_questions(text, key_entities, noun_phrases, question_co
         elif question_type == 'detail':
             # Detail questions
             if noun_phrases:
-                answer = random.choice(noun_phrases)
-                question = generate_question_with_t5(text, answer)
+                answer = planner.take('phrase')
             else:
-                answer = random.choice(key_entities) if key_entities else "specific detail"
-                question = generate_question_with_t5(text, answer)
+                answer = planner.take('entity') if key_entities else "specific detail"
+            use_t5 = True
                 
         else:  # vocabulary
             # Vocabulary in context
             if key_entities:
-                answer = random.choice(key_entities)
+                answer = planner.take('entity')
                 question = f"In the context of this passage, what does '{answer}' refer to?"
             else:
                 answer = "contextual meaning"
                 question = "What is the contextual meaning of the key term mentioned?"
         
-        # Generate question if T5 failed
-        if not question or question == answer:
-            question = f"According to the text, what is mentioned about {answer}?"
-        
-        # Generate distractors
-        distractors = generate_smart_distractors(answer, text, key_entities, noun_phrases)
-        
-        # Create options and shuffle
-        options = [answer] + distractors
-        random.shuffle(options)
-        correct_index = options.index(answer)
-        
-        # Generate explanation
-        explanation = f"The correct answer is '{answer}' as it is directly supported by the information provided in the text."
-        
-        questions.append({
-            "id": f"q{i + 1}",
-            "question": question,
-            "options": options,
-            "correctAnswer": correct_index,
-            "explanation": explanation,
-            "difficulty": difficulty,
-            "type": question_type
-        })
+        # Condition generation only on the window that contains the answer
+        context = analysis.window_for(answer) if use_t5 else None
+        slots.append(QuestionSlot(question_type, answer, question, context))
+    
+    return slots
+
+def build_question(index, slot, question, text, key_entities, noun_phrases, analysis, candidates=None):
+    """Turn a planned slot and its question text into the question dict returned to clients"""
+    answer = slot.answer
+    
+    # Generate question if T5 failed
+    if not question or question == answer:
+        question = f"According to the text, what is mentioned about {answer}?"
+    
+    # Generate distractors
+    distractors = generate_smart_distractors(answer, text, key_entities, noun_phrases, analysis, candidates)
+    
+    # Create options and shuffle
+    options = [answer] + distractors
+    quiz_random().shuffle(options)
+    correct_index = options.index(answer)
+    
+    # Generate explanation
+    explanation = f"The correct answer is '{answer}' as it is directly supported by the information provided in the text."
+    
+    return {
+        "id": f"q{index + 1}",
+        "question": question,
+        "options": options,
+        "correctAnswer": correct_index,
+        "explanation": explanation,
+        "difficulty": analysis.difficulty,
+        "type": slot.question_type
+    }
+
+def is_model_question(slot, question):
+    """Whether a question slot ended up with a usable T5 question rather than a template"""
+    return slot.context is not None and bool(question) and question != slot.answer
+
+def generate_unique_questions(pairs, strategy, deadline, planner):
+    """Generate every distinct (context, answer) pair once and share the question between repeats"""
+    unique_pairs = list(dict.fromkeys(pairs))
+    planner.record_generation(len(pairs), len(unique_pairs))
+    generated = dict(zip(unique_pairs, generate_questions(unique_pairs, strategy, deadline)))
+    return [generated[pair] for pair in pairs]
+
+def fresh_slot(slot, planner, analysis):
+    """Same question type as `slot` with an answer no other question uses, or None when none is left"""
+    answer = planner.take('phrase' if slot.question_type == 'detail' else 'entity', allow_repeat=False)
+    if answer is None:
+        return None
+    return slot._replace(answer=answer, context=analysis.window_for(answer))
+
+def replace_near_duplicates(slots, questions, analysis, planner, strategy, deadline):
+    """Regenerate only the model questions that nearly duplicate an earlier one, in place"""
+    seen = NearDuplicateFilter(QUESTION_DUPLICATE_THRESHOLD)
+    collisions = []
+    for i, (slot, question) in enumerate(zip(slots, questions)):
+        if not is_model_question(slot, question):
+            continue
+        if seen.is_duplicate(question):
+            collisions.append(i)
+        else:
+            seen.add(question)
+    if not collisions:
+        return
+    
+    # Colliding questions get a fresh answer; those without one fall back to a template
+    retries = []
+    for i in collisions:
+        questions[i] = None
+        slot = fresh_slot(slots[i], planner, analysis)
+        if slot is not None:
+            retries.append((i, slot))
+    if not retries or (deadline is not None and time.monotonic() >= deadline):
+        return
+    
+    regenerated = generate_unique_questions([(slot.context, slot.answer) for _, slot in retries], strategy, deadline, planner)
+    planner.regenerated += len(retries)
+    for (i, slot), question in zip(retries, regenerated):
+        if is_model_question(slot, question) and not seen.is_duplicate(question):
+            seen.add(question)
+            slots[i] = slot
+            questions[i] = question
+
+def create_comprehensive_questions(text, key_entities, noun_phrases, question_count, analysis=None, budget=None, planner=None):
+    """Create different types of questions for comprehensive assessment"""
+    analysis = analysis or analyze_text(text)
+    budget = budget or GenerationBudget(decoding_latency)
+    planner = planner or AnswerPlanner(analysis)
+    with metrics.stage('planning'):
+        slots = plan_question_slots(text, key_entities, noun_phrases, question_count, analysis, planner)
+    
+    # Run the T5 generations the latency budget allows in as few batched calls as possible
+    t5_pairs = [(slot.context, slot.answer) for slot in slots if slot.context is not None]
+    strategy, allowed = budget.plan(len(t5_pairs))
+    with metrics.stage('model_wait'):
+        generated = generate_unique_questions(t5_pairs[:allowed], strategy, budget.deadline, planner)
+        generated = iter(generated + [None] * (len(t5_pairs) - allowed))
+        texts = [next(generated) if slot.context is not None else slot.question for slot in slots]
+        replace_near_duplicates(slots, texts, analysis, planner, strategy, budget.deadline)
+    
+    # Distractors for every question in one vectorized similarity pass
+    with metrics.stage('distractors'):
+        candidates = get_distractor_engine(analysis).distractors_for([slot.answer for slot in slots])
+        questions = []
+        for i, (slot, question) in enumerate(zip(slots, texts)):
+            budget.record(is_model_question(slot, question))
+            questions.append(build_question(i, slot, question, text, key_entities, noun_phrases, analysis, candidates[i]))
     
     return questions
 
+def iter_comprehensive_questions(text, key_entities, noun_phrases, question_count, analysis=None, budget=None, planner=None):
+    """Yield questions one at a time as soon as each is ready; closing the generator cancels pending work"""
+    analysis = analysis or analyze_text(text)
+    budget = budget or GenerationBudget(decoding_latency)
+    planner = planner or AnswerPlanner(analysis)
+    with metrics.stage('planning'):
+        slots = plan_question_slots(text, key_entities, noun_phrases, question_count, analysis, planner)
+    t5_indexes = [i for i, slot in enumerate(slots) if slot.context is not None]
+    strategy, allowed = budget.plan(len(t5_indexes))
+    candidates = get_distractor_engine(analysis).distractors_for([slot.answer for slot in slots])
+    seen = NearDuplicateFilter(QUESTION_DUPLICATE_THRESHOLD)
+    
+    def finish(i, question):
+        # Questions already sent cannot be replaced, so a near-duplicate is regenerated with a fresh answer
+        slot = slots[i]
+        if is_model_question(slot, question) and seen.is_duplicate(question):
+            question = None
+            retry = fresh_slot(slot, planner, analysis)
+            if retry is not None and (budget.deadline is None or time.monotonic() < budget.deadline):
+                planner.regenerated += 1
+                regenerated = generate_unique_questions([(retry.context, retry.answer)], strategy, budget.deadline, planner)[0]
+                if is_model_question(retry, regenerated) and not seen.is_duplicate(regenerated):
+                    slot, question = retry, regenerated
+        if is_model_question(slot, question):
+            seen.add(question)
+        budget.record(is_model_question(slot, question))
+        with metrics.stage('distractors'):
+            return build_question(i, slot, question, text, key_entities, noun_phrases, analysis,
+                                  candidates[i] if slot is slots[i] else None)
+    
+    # Template questions need no model call and go out first
+    for i, slot in enumerate(slots):
+        if slot.context is None:
+            yield finish(i, slot.question)
+    
+    pending = set(t5_indexes)
+    pairs = [(slots[i].context, slots[i].answer) for i in t5_indexes[:allowed]]
+    if generation_scheduler is None:
+        # Without the scheduler, generate one question per call so each can be sent immediately
+        generated = {}
+        for i, pair in zip(t5_indexes, pairs):
+            if pair not in generated:
+                generated[pair] = generate_unique_questions([pair], strategy, budget.deadline, planner)[0]
+            else:
+                planner.record_generation(1, 0)
+            pending.discard(i)
+            yield finish(i, generated[pair])
+    else:
+        # Slots that share an answer share one generation
+        unique_pairs = list(dict.fromkeys(pairs))
+        planner.record_generation(len(pairs), len(unique_pairs))
+        futures, pending_writes = submit_questions(unique_pairs, strategy, budget.deadline)
+        future_by_pair = dict(zip(unique_pairs, futures))
+        slots_by_future = {}
+        for i, pair in zip(t5_indexes, pairs):
+            slots_by_future.setdefault(future_by_pair[pair], []).append(i)
+        try:
+            for future in as_completed(futures, timeout=budget.remaining()):
+                for i in slots_by_future[future]:
+                    pending.discard(i)
+                    yield finish(i, future.result())
+        except FuturesTimeoutError:
+            logger.info(f"Deadline reached with {len(pending)} streamed questions outstanding, using templates")
+        finally:
+            # Client went away, the deadline passed or the stream failed: drop jobs the scheduler has not started
+            for future in futures:
+                future.cancel()
+            store_generated_questions(pending_writes)
+    
+    # Slots the budget could not afford fall back to template questions
+    for i in sorted(pending):
+        yield finish(i, None)
+
+def record_quiz_metrics(budget, planner):
+    """Count how the questions of a finished quiz were produced"""
+    metrics.inc('quiz_questions_total', budget.model_generated, source='model')
+    metrics.inc('quiz_questions_total', budget.template_generated, source='template')
+    metrics.inc('quiz_model_calls_saved_total', max(0, planner.model_slots - planner.model_calls))
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    metrics.inc('http_requests_in_flight')
+    begin_request_timings(request.headers.get(DEBUG_TIMING_HEADER, '').lower() in ('1', 'true', 'yes'))
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.inc('http_requests_total', endpoint=endpoint, status=response.status_code)
+    metrics.observe('http_request_seconds', time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Runs after a streamed body has been fully sent
+    metrics.inc('http_requests_in_flight', -1)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Counters, stage latency histograms and queue gauges in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def admit_model_request():
+    """Admission ticket for a model-backed request, using the X-Client-Id and X-Priority headers"""
+    if admission is None:
+        return None
+    client = request.headers.get('X-Client-Id') or request.remote_addr or 'anonymous'
+    return admission.acquire(client, request.headers.get('X-Priority', 'normal').lower())
+
+def admission_rejected_response(rejection):
+    """429 response telling the client when the generation queue is expected to have room"""
+    response = jsonify({"error": "Too many generation requests, retry later", "reason": rejection.reason})
+    response.headers["Retry-After"] = str(rejection.retry_after)
+    return response, 429
+
+def model_not_ready_response():
+    """503 response for model-backed routes called before the model is loaded, warmed up and scheduled"""
+    response = jsonify({"error": "Model is still loading", "startup": startup_state.to_dict()})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "alive", "uptimeSeconds": startup_state.to_dict()["uptimeSeconds"]})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: models are loaded and warmed up"""
+    state = startup_state.to_dict()
+    return jsonify(state), 200 if state["ready"] else 503
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy", 
         "model_loaded": question_generator is not None,
+        "startup": startup_state.to_dict(),
+        "scheduler_queue_depth": generation_scheduler.queue_depth if generation_scheduler else 0,
+        "generation_cache": generation_cache.stats() if generation_cache else None,
+        "decoding_latency": decoding_latency.stats(),
+        "tokenizer": question_encoder.stats() if question_encoder else None,
+        "nlp_backend": {"name": NLP_BACKEND, "processes": nlp_pool.processes if nlp_pool else 1},
+        "admission": admission.stats() if admission else None,
+        "coalescing": quiz_coalescer.stats() if quiz_coalescer else None,
+        "quiz_bank": quiz_bank.stats() if quiz_bank else None,
         "service": "AI Quiz Generator with T5"
     })
 
+def parse_paragraph_request(data):
+    """Read and validate the paragraph quiz request body, returning (paragraph, question_count, error)"""
+    paragraph = data.get('paragraph', '').strip()
+    question_count = data.get('questionCount', 5)
+    
+    # Validation
+    if not paragraph:
+        return paragraph, question_count, "Paragraph is required"
+    
+    if len(paragraph) < 100:
+        return paragraph, question_count, "Paragraph should be at least 100 characters long"
+    
+    if question_count < 1 or question_count > 20:
+        return paragraph, question_count, "Question count should be between 1 and 20"
+    
+    return paragraph, question_count, None
+
+def parse_quiz_seed(data):
+    """Read the optional integer seed request field, returning (seed, error)"""
+    seed = data.get('seed')
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        return None, "seed should be an integer"
+    return seed, None
+
+def quiz_random():
+    """Random source for option shuffles and distractor picks of the current request"""
+    return request_random.get() or random
+
+@contextmanager
+def seeded_random(seed):
+    """Draw the randomness of the enclosed quiz generation from a Random seeded with `seed`"""
+    if seed is None:
+        yield
+        return
+    token = request_random.set(random.Random(seed))
+    try:
+        yield
+    finally:
+        request_random.reset(token)
+
+def parse_generation_budget(data, deterministic=False):
+    """Read the optional deadlineMs and qualityTier request fields, returning (budget, error)"""
+    deadline_ms = data.get('deadlineMs')
+    quality_tier = data.get('qualityTier', 'best')
+    
+    if deadline_ms is not None and (isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0):
+        return None, "deadlineMs should be a positive number of milliseconds"
+    
+    if quality_tier not in QUALITY_TIERS:
+        return None, f"qualityTier should be one of: {', '.join(QUALITY_TIERS)}"
+    
+    return GenerationBudget(decoding_latency, deadline_ms=deadline_ms, quality_tier=quality_tier, deterministic=deterministic), None
+
+def bank_questions(kind, lookup):
+    """Questions from the quiz bank renumbered for this quiz, or None when disabled or on a miss"""
+    if quiz_bank is None:
+        return None
+    try:
+        found = lookup(quiz_bank)
+    except Exception as e:
+        logger.warning(f"Quiz bank lookup failed, generating live: {str(e)}")
+        found = None
+    metrics.inc('quiz_bank_lookups_total', kind=kind, result='hit' if found else 'miss')
+    if not found:
+        return None
+    questions, extra = found if isinstance(found, tuple) else (found, None)
+    for i, question in enumerate(questions):
+        question["id"] = f"q{i + 1}"
+    return questions, extra
+
+def build_paragraph_quiz(paragraph, key_entities, noun_phrases, questions, question_count):
+    """Assemble the paragraph quiz payload around its questions"""
+    # Determine main topic
+    main_topic = noun_phrases[0] if noun_phrases else (key_entities[0] if key_entities else "Text Analysis")
+    
+    # Calculate estimated time (1.5 minutes per question)
+    estimated_time = question_count * 90
+    
+    return {
+        "id": f"t5-generated-{quiz_random().randint(1000, 9999)}",
+        "title": f"Comprehension Quiz: {main_topic}",
+        "description": f"AI-generated quiz from text analysis using T5 model and advanced NLP techniques",
+        "questions": questions,
+        "timeLimit": estimated_time,
+        "topic": main_topic,
+        "generatedBy": "paragraph",
+        "metadata": {
+            "createdAt": "2024-01-01T00:00:00Z",
+            "questionCount": question_count,
+            "estimatedTime": estimated_time,
+            "textLength": len(paragraph),
+            "keyEntities": len(key_entities),
+            "nounPhrases": len(noun_phrases)
+        }
+    }
+
+def generate_paragraph_quiz(paragraph, question_count, budget, seed=None):
+    """Run the quiz pipeline for a paragraph in an admission slot and return the quiz payload"""
+    ticket = admit_model_request()
+    logger.info(f"Generating {question_count} questions from paragraph of length {len(paragraph)}")
+    
+    with ticket or nullcontext():
+        # Extract key information from text in a single NLP pass
+        analysis = analyze_text(paragraph)
+        key_entities, noun_phrases = extract_key_entities(paragraph, analysis)
+        logger.info(f"Extracted {len(key_entities)} key entities and {len(noun_phrases)} noun phrases")
+        
+        # Generate comprehensive questions
+        planner = AnswerPlanner(analysis)
+        questions = create_comprehensive_questions(paragraph, key_entities, noun_phrases, question_count, analysis, budget, planner)
+    
+    quiz_data = build_paragraph_quiz(paragraph, key_entities, noun_phrases, questions, len(questions))
+    quiz_data["metadata"]["generation"] = budget.to_metadata()
+    quiz_data["metadata"]["planner"] = planner.to_metadata()
+    quiz_data["metadata"]["source"] = "live"
+    quiz_data["metadata"]["seed"] = seed
+    record_quiz_metrics(budget, planner)
+    
+    logger.info(f"Successfully generated {len(questions)} questions using T5 model")
+    return quiz_data
+
 @app.route('/generate-quiz', methods=['POST'])
 def generate_quiz_from_paragraph():
     """Generate quiz questions from a paragraph using T5 and NLP"""
     try:
         data = request.get_json()
-        paragraph = data.get('paragraph', '').strip()
-        question_count = data.get('questionCount', 5)
+        paragraph, question_count, error = parse_paragraph_request(data)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Validation
-        if not paragraph:
-            return jsonify({"error": "Paragraph is required"}), 400
+        seed, error = parse_quiz_seed(data)
+        if error:
+            return jsonify({"error": error}), 400
         
-        if len(paragraph) < 100:
-            return jsonify({"error": "Paragraph should be at least 100 characters long"}), 400
+        # Passages in the quiz bank are served without touching the model or an admission slot
+        with seeded_random(seed):
+            banked = bank_questions(
+                'paragraph', lambda bank: bank.sample_passage(content_hash(paragraph), question_count, quiz_random())
+            )
+            if banked:
+                questions, extracted = banked
+                quiz_data = build_paragraph_quiz(
+                    paragraph, extracted.get("keyEntities", []), extracted.get("nounPhrases", []), questions, len(questions)
+                )
+                quiz_data["metadata"]["source"] = "bank"
+                quiz_data["metadata"]["seed"] = seed
+                metrics.inc('quiz_questions_total', len(questions), source='bank')
+                logger.info(f"Served {len(questions)} questions from the quiz bank")
+                with metrics.stage('serialize'):
+                    return jsonify(quiz_data)
         
-        if question_count < 1 or question_count > 20:
-            return jsonify({"error": "Question count should be between 1 and 20"}), 400
+        if not startup_state.is_ready:
+            return model_not_ready_response()
         
-        logger.info(f"Generating {question_count} questions from paragraph of length {len(paragraph)}")
+        budget, error = parse_generation_budget(data, deterministic=seed is not None)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Extract key information from text
-        key_entities, noun_phrases = extract_key_entities(paragraph)
-        logger.info(f"Extracted {len(key_entities)} key entities and {len(noun_phrases)} noun phrases")
+        def compute():
+            with seeded_random(seed):
+                return generate_paragraph_quiz(paragraph, question_count, budget, seed)
         
-        # Generate comprehensive questions
-        questions = create_comprehensive_questions(paragraph, key_entities, noun_phrases, question_count)
+        # Identical requests wait on one generation instead of each running the pipeline
+        try:
+            if quiz_coalescer is None:
+                quiz_data, outcome = compute(), COMPUTED
+            else:
+                key = request_key(
+                    paragraph,
+                    questionCount=question_count,
+                    deadlineMs=budget.deadline_ms,
+                    qualityTier=budget.quality_tier,
+                    seed=seed
+                )
+                use_cache = 'no-cache' not in request.headers.get('Cache-Control', '')
+                quiz_data, outcome = quiz_coalescer.run(key, compute, use_cache, admission.follow if admission else None)
+        except AdmissionRejected as rejection:
+            return admission_rejected_response(rejection)
+        except FuturesTimeoutError:
+            # Waited as long as a queued request would on an identical generation that has not finished
+            return admission_rejected_response(AdmissionRejected('queue_timeout', admission.retry_after() if admission else 1))
         
-        # Determine main topic
-        main_topic = noun_phrases[0] if noun_phrases else (key_entities[0] if key_entities else "Text Analysis")
+        # The payload may be shared with other requests, so per-request fields go on a copy of its metadata
+        quiz_data = dict(quiz_data, metadata=dict(quiz_data["metadata"], coalescing=outcome))
         
-        # Calculate estimated time (1.5 minutes per question)
-        estimated_time = question_count * 90
+        # Stage breakdown requested through the debug header; serialization is only in the histograms
+        timings = request_timings()
+        if timings is not None:
+            quiz_data["metadata"]["timings"] = timings
         
-        quiz_data = {
-            "id": f"t5-generated-{random.randint(1000, 9999)}",
-            "title": f"Comprehension Quiz: {main_topic}",
-            "description": f"AI-generated quiz from text analysis using T5 model and advanced NLP techniques",
-            "questions": questions,
-            "timeLimit": estimated_time,
-            "topic": main_topic,
-            "generatedBy": "paragraph",
-            "metadata": {
-                "createdAt": "2024-01-01T00:00:00Z",
-                "questionCount": len(questions),
-                "estimatedTime": estimated_time,
-                "textLength": len(paragraph),
-                "keyEntities": len(key_entities),
-                "nounPhrases": len(noun_phrases)
-            }
-        }
+        with metrics.stage('serialize'):
+            return jsonify(quiz_data)
         
-        logger.info(f"Successfully generated {len(questions)} questions using T5 model")
-        return jsonify(quiz_data)
+    except Exception as e:
+        logger.error(f"Error generating quiz: {str(e)}")
+        return jsonify({"error": f"Failed to generate quiz: {str(e)}"}), 500
+
+@app.route('/generate-quiz/stream', methods=['POST'])
+def generate_quiz_stream():
+    """Stream quiz metadata, then each question as soon as it is generated, as NDJSON"""
+    if not startup_state.is_ready:
+        return model_not_ready_response()
+    
+    try:
+        data = request.get_json()
+        paragraph, question_count, error = parse_paragraph_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        budget, error = parse_generation_budget(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        try:
+            ticket = admit_model_request()
+        except AdmissionRejected as rejection:
+            return admission_rejected_response(rejection)
+        
+        logger.info(f"Streaming {question_count} questions from paragraph of length {len(paragraph)}")
+        
+        try:
+            analysis = analyze_text(paragraph)
+            key_entities, noun_phrases = extract_key_entities(paragraph, analysis)
+            quiz_data = build_paragraph_quiz(paragraph, key_entities, noun_phrases, [], question_count)
+            del quiz_data["questions"]
+        except Exception:
+            if ticket:
+                ticket.release()
+            raise
         
     except Exception as e:
         logger.error(f"Error generating quiz: {str(e)}")
         return jsonify({"error": f"Failed to generate quiz: {str(e)}"}), 500
+    
+    def events():
+        yield json.dumps({"type": "quiz", "quiz": quiz_data}) + "\n"
+        planner = AnswerPlanner(analysis)
+        questions = iter_comprehensive_questions(paragraph, key_entities, noun_phrases, question_count, analysis, budget, planner)
+        sent = 0
+        try:
+            for question in questions:
+                yield json.dumps({"type": "question", "question": question}) + "\n"
+                sent += 1
+            record_quiz_metrics(budget, planner)
+            done = {"type": "done", "questionCount": sent, "generation": budget.to_metadata(), "planner": planner.to_metadata()}
+            if request_timings() is not None:
+                done["timings"] = request_timings()
+            yield json.dumps(done) + "\n"
+            logger.info(f"Successfully streamed {sent} questions using T5 model")
+        except GeneratorExit:
+            logger.info(f"Client disconnected after {sent} streamed questions, cancelling remaining generation")
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming quiz: {str(e)}")
+            yield json.dumps({"type": "error", "error": f"Failed to generate quiz: {str(e)}"}) + "\n"
+        finally:
+            questions.close()
+    
+    response = Response(stream_with_context(events()), mimetype='application/x-ndjson')
+    # The slot is held until the stream is closed, whether it finished or the client went away
+    if ticket:
+        response.call_on_close(ticket.release)
+    return response
+
+def parse_job_paragraphs():
+    """Read job items from a JSON body or an uploaded text file with blank-line separated paragraphs"""
+    if 'file' in request.files:
+        content = request.files['file'].read().decode('utf-8', errors='replace')
+        paragraphs = [block.strip() for block in re.split(r'\n\s*\n', content) if block.strip()]
+        return paragraphs, request.form
+    data = request.get_json() or {}
+    return data.get('paragraphs', []), data
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue bulk quiz generation for many paragraphs and return a job id"""
+    try:
+        paragraphs, options = parse_job_paragraphs()
+        
+        # Validation; form uploads send questionCount as a string
+        try:
+            question_count = int(options.get('questionCount', 5))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Question count should be an integer"}), 400
+        
+        if not isinstance(paragraphs, list) or not paragraphs:
+            return jsonify({"error": "A non-empty list of paragraphs or a file is required"}), 400
+        
+        if len(paragraphs) > JOB_MAX_ITEMS:
+            return jsonify({"error": f"A job can contain at most {JOB_MAX_ITEMS} paragraphs"}), 400
+        
+        if not all(isinstance(paragraph, str) for paragraph in paragraphs):
+            return jsonify({"error": "Every paragraph must be a string"}), 400
+        
+        if question_count < 1 or question_count > JOB_MAX_QUESTION_COUNT:
+            return jsonify({"error": f"Question count should be between 1 and {JOB_MAX_QUESTION_COUNT}"}), 400
+        
+        job_id = job_store.create([paragraph.strip() for paragraph in paragraphs], question_count)
+        if job_dispatcher is not None:
+            job_dispatcher.start()
+        logger.info(f"Queued job {job_id} with {len(paragraphs)} paragraphs")
+        
+        return jsonify({
+            "jobId": job_id,
+            "status": "queued",
+            "itemCount": len(paragraphs),
+            "statusUrl": f"/jobs/{job_id}",
+            "resultsUrl": f"/jobs/{job_id}/results"
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error creating job: {str(e)}")
+        return jsonify({"error": f"Failed to create job: {str(e)}"}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report job progress and the quizzes finished so far"""
+    include_results = request.args.get('results', '1') != '0'
+    job = job_store.get(job_id, include_results=include_results)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Stop dispatching the remaining items of a job"""
+    job = job_store.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def download_job_results(job_id):
+    """Download the finished quizzes of a job as NDJSON, one line per paragraph"""
+    if job_store.get(job_id, include_results=False) is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def lines():
+        for result in job_store.results(job_id):
+            yield json.dumps(result) + "\n"
+    
+    return Response(
+        lines(),
+        mimetype='application/x-ndjson',
+        headers={"Content-Disposition": f"attachment; filename=job-{job_id}.ndjson"}
+    )
 
 @app.route('/generate-quiz-keyword', methods=['POST'])
 def generate_quiz_from_keyword():
@@ -338,13 +1230,22 @@ def generate_quiz_from_keyword():
         if not keyword:
             return jsonify({"error": "Keyword is required"}), 400
         
+        seed, error = parse_quiz_seed(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
         logger.info(f"Generating {question_count} {difficulty} questions for keyword: {keyword}")
         
-        # Generate knowledge-based questions
-        questions = generate_keyword_questions(keyword, question_count, difficulty)
+        # Pregenerated questions when the bank has this keyword, otherwise knowledge-based generation
+        with seeded_random(seed):
+            banked = bank_questions(
+                'keyword', lambda bank: bank.sample_keyword(keyword, difficulty, question_count, quiz_random())
+            )
+            questions = banked[0] if banked else generate_keyword_questions(keyword, question_count, difficulty)
+            quiz_id = f"keyword-{quiz_random().randint(1000, 9999)}"
         
         quiz_data = {
-            "id": f"keyword-{random.randint(1000, 9999)}",
+            "id": quiz_id,
             "title": f"{keyword.title()} Quiz - {difficulty.title()} Level",
             "description": f"Comprehensive {difficulty} level quiz covering key concepts of {keyword}",
             "questions": questions,
@@ -355,7 +1256,9 @@ def generate_quiz_from_keyword():
             "metadata": {
                 "createdAt": "2024-01-01T00:00:00Z",
                 "questionCount": len(questions),
-                "estimatedTime": question_count * 90
+                "estimatedTime": question_count * 90,
+                "source": "bank" if banked else "live",
+                "seed": seed
             }
         }
         
@@ -365,64 +1268,55 @@ def generate_quiz_from_keyword():
         logger.error(f"Error generating quiz from keyword: {str(e)}")
         return jsonify({"error": f"Failed to generate quiz: {str(e)}"}), 500
 
+# Keyword question templates and options per difficulty, formatted with the keyword on each call
+KEYWORD_TEMPLATES = {
+    "easy": (
+        "What is {keyword}?",
+        "Which of the following best describes {keyword}?",
+        "What is the main purpose of {keyword}?",
+        "In which field is {keyword} commonly used?",
+        "What are the basic components of {keyword}?"
+    ),
+    "medium": (
+        "How does {keyword} work in practice?",
+        "What are the key advantages of using {keyword}?",
+        "Which principle is fundamental to {keyword}?",
+        "What challenges are associated with {keyword}?",
+        "How has {keyword} evolved over time?"
+    ),
+    "hard": (
+        "What are the advanced applications of {keyword}?",
+        "How does {keyword} integrate with other systems?",
+        "What are the theoretical foundations of {keyword}?",
+        "What future developments are expected in {keyword}?",
+        "How do experts optimize {keyword} for complex scenarios?"
+    )
+}
+KEYWORD_OPTIONS = {
+    "easy": ("Fundamental concept related to {keyword}", ("Unrelated technology", "Different methodology", "Alternative approach")),
+    "medium": ("Practical application of {keyword} principles", ("Theoretical concept only", "Outdated methodology", "Unproven technique")),
+    "hard": ("Advanced implementation of {keyword} in complex systems", (
+        "Basic application without optimization",
+        "Simplified version for beginners",
+        "Legacy system approach"
+    ))
+}
+
 def generate_keyword_questions(keyword, question_count, difficulty):
     """Generate questions based on keyword with varying difficulty"""
     questions = []
     
-    # Question templates based on difficulty
-    if difficulty == "easy":
-        templates = [
-            f"What is {keyword}?",
-            f"Which of the following best describes {keyword}?",
-            f"What is the main purpose of {keyword}?",
-            f"In which field is {keyword} commonly used?",
-            f"What are the basic components of {keyword}?"
-        ]
-    elif difficulty == "medium":
-        templates = [
-            f"How does {keyword} work in practice?",
-            f"What are the key advantages of using {keyword}?",
-            f"Which principle is fundamental to {keyword}?",
-            f"What challenges are associated with {keyword}?",
-            f"How has {keyword} evolved over time?"
-        ]
-    else:  # hard
-        templates = [
-            f"What are the advanced applications of {keyword}?",
-            f"How does {keyword} integrate with other systems?",
-            f"What are the theoretical foundations of {keyword}?",
-            f"What future developments are expected in {keyword}?",
-            f"How do experts optimize {keyword} for complex scenarios?"
-        ]
+    # Anything other than easy or medium uses the hard templates
+    level = difficulty if difficulty in ("easy", "medium") else "hard"
+    templates = [template.format(keyword=keyword) for template in KEYWORD_TEMPLATES[level]]
+    correct_option = KEYWORD_OPTIONS[level][0].format(keyword=keyword)
+    distractors = list(KEYWORD_OPTIONS[level][1])
     
     for i in range(question_count):
         template = templates[i % len(templates)]
         
-        # Generate context-appropriate options
-        if difficulty == "easy":
-            correct_option = f"Fundamental concept related to {keyword}"
-            distractors = [
-                "Unrelated technology",
-                "Different methodology",
-                "Alternative approach"
-            ]
-        elif difficulty == "medium":
-            correct_option = f"Practical application of {keyword} principles"
-            distractors = [
-                "Theoretical concept only",
-                "Outdated methodology",
-                "Unproven technique"
-            ]
-        else:  # hard
-            correct_option = f"Advanced implementation of {keyword} in complex systems"
-            distractors = [
-                "Basic application without optimization",
-                "Simplified version for beginners",
-                "Legacy system approach"
-            ]
-        
         options = [correct_option] + distractors
-        random.shuffle(options)
+        quiz_random().shuffle(options)
         correct_index = options.index(correct_option)
         
         questions.append({
@@ -500,6 +1394,63 @@ def analyze_performance():
         logger.error(f"Error analyzing performance: {str(e)}")
         return jsonify({"error": "Failed to analyze performance"}), 500
 
+def parse_performance_attempts():
+    """Read attempts from a JSON body or an NDJSON stream, returning (attempts, options, error)"""
+    if request.mimetype == 'application/x-ndjson':
+        attempts = []
+        for line_number, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                attempts.append(json.loads(line))
+            except ValueError:
+                return None, None, f"Line {line_number} is not valid JSON"
+            if len(attempts) > PERFORMANCE_BATCH_MAX_ATTEMPTS:
+                break
+        options = request.args
+    else:
+        options = request.get_json() or {}
+        attempts = options.get('attempts', [])
+    
+    if not isinstance(attempts, list) or not attempts:
+        return None, None, "At least one attempt is required"
+    if len(attempts) > PERFORMANCE_BATCH_MAX_ATTEMPTS:
+        return None, None, f"A batch can contain at most {PERFORMANCE_BATCH_MAX_ATTEMPTS} attempts"
+    if not all(isinstance(attempt, dict) for attempt in attempts):
+        return None, None, "Every attempt should be an object with quiz and userAnswers"
+    return attempts, options, None
+
+@app.route('/analyze-performance/batch', methods=['POST'])
+def analyze_performance_batch():
+    """Score many attempts at once with cohort breakdowns and item statistics"""
+    try:
+        attempts, options, error = parse_performance_attempts()
+        if error:
+            return jsonify({"error": error}), 400
+        
+        include_attempts = str(options.get('includeAttempts', True)).lower() not in ('0', 'false', 'no')
+        report, matrix = analyze_attempts(attempts, include_attempts=include_attempts)
+        
+        # Fold the batch into the cohort's running aggregates
+        cohort = options.get('cohort')
+        if cohort:
+            performance_store.add(str(cohort), matrix)
+            report["cohort"] = str(cohort)
+        
+        return jsonify(report)
+        
+    except Exception as e:
+        logger.error(f"Error analyzing performance batch: {str(e)}")
+        return jsonify({"error": "Failed to analyze performance"}), 500
+
+@app.route('/analyze-performance/cohorts/<cohort>', methods=['GET'])
+def cohort_performance(cohort):
+    """Running aggregates of a cohort, or of one of its users with ?userId="""
+    summary = performance_store.summary(cohort, request.args.get('userId'))
+    if summary is None:
+        return jsonify({"error": "No attempts recorded for this cohort"}), 404
+    return jsonify(summary)
+
 def generate_recommendations(percentage, topic_performance, difficulty_performance):
     """Generate personalized recommendations based on performance"""
     recommendations = []
@@ -528,9 +1479,14 @@ def generate_recommendations(percentage, topic_performance, difficulty_performan
     
     return recommendations
 
+# Opt-in for WSGI servers without startup hooks. Spawned pool processes re-run this file as
+# __mp_main__ and must not load a model they never use
+if T5_LOAD_ON_IMPORT and __name__ not in ('__main__', '__mp_main__'):
+    start_background_loading()
+
 if __name__ == '__main__':
-    # Load models on startup
-    load_models()
+    # Load models in the background so liveness probes are answered meanwhile
+    start_background_loading()
     
     # Run the Flask app
     app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
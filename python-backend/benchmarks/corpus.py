@@ -0,0 +1,61 @@
+# Fixed benchmark corpus of short, medium and long passages with known answer spans
+
+SHORT = (
+    "Photosynthesis is the process used by green plants to convert light energy into chemical energy. "
+    "The chlorophyll in the leaves absorbs sunlight, and the plant releases oxygen as a byproduct."
+)
+
+MEDIUM = (
+    "The French Revolution began in 1789 and transformed the political landscape of Europe. "
+    "Financial crisis, food shortages and resentment of aristocratic privilege pushed the Third Estate "
+    "to declare itself the National Assembly. The storming of the Bastille on 14 July became a symbol "
+    "of popular resistance to royal authority. Over the following years the monarchy was abolished, "
+    "King Louis XVI was executed, and the radical Jacobins led the Reign of Terror under Robespierre. "
+    "The revolution ended with the rise of Napoleon Bonaparte, who seized power in a coup in 1799 and "
+    "later crowned himself emperor. Its ideals of liberty, equality and fraternity shaped modern democracy."
+)
+
+LONG = " ".join([
+    "The human circulatory system transports blood, nutrients, oxygen and hormones throughout the body.",
+    "At its centre is the heart, a muscular organ with four chambers: two atria and two ventricles.",
+    "The right side of the heart receives deoxygenated blood from the body and pumps it to the lungs.",
+    "In the lungs, carbon dioxide is exchanged for oxygen across the thin walls of the alveoli.",
+    "Oxygenated blood returns to the left atrium and is pumped by the left ventricle into the aorta.",
+    "The aorta branches into arteries, which divide into smaller arterioles and finally capillaries.",
+    "Capillaries are so narrow that red blood cells pass through them in single file.",
+    "Across capillary walls, oxygen and glucose diffuse into tissues while waste products diffuse out.",
+    "Blood then collects in venules and veins, which carry it back towards the heart.",
+    "Veins contain valves that prevent backflow, helped by the squeezing action of skeletal muscles.",
+    "Red blood cells contain haemoglobin, an iron-rich protein that binds oxygen in the lungs.",
+    "White blood cells defend the body against infection by engulfing pathogens or producing antibodies.",
+    "Platelets are small cell fragments that help form clots when a blood vessel is damaged.",
+    "Plasma, the liquid part of blood, carries dissolved salts, proteins, hormones and nutrients.",
+    "Blood pressure is the force exerted by circulating blood on the walls of the arteries.",
+    "It is recorded as systolic pressure during contraction and diastolic pressure during relaxation.",
+    "Chronic high blood pressure, called hypertension, increases the risk of stroke and heart disease.",
+    "The coronary arteries supply the heart muscle itself with oxygen-rich blood.",
+    "A blockage in a coronary artery can starve the muscle of oxygen and cause a heart attack.",
+    "Regular exercise strengthens the heart and improves the efficiency of the circulatory system.",
+    "The lymphatic system works alongside circulation, returning excess tissue fluid to the bloodstream.",
+    "William Harvey first described the full circulation of blood through the body in 1628.",
+    "Before his work, many physicians believed that blood was continuously produced by the liver.",
+    "Modern medicine uses tools such as the electrocardiogram to monitor the electrical activity of the heart.",
+] * 3)
+
+CORPUS = [
+    {
+        "name": "short",
+        "paragraph": SHORT,
+        "answers": ["chlorophyll", "oxygen", "light energy"]
+    },
+    {
+        "name": "medium",
+        "paragraph": MEDIUM,
+        "answers": ["1789", "Bastille", "Robespierre", "Napoleon Bonaparte", "National Assembly"]
+    },
+    {
+        "name": "long",
+        "paragraph": LONG,
+        "answers": ["haemoglobin", "platelets", "aorta", "William Harvey", "hypertension", "alveoli"]
+    },
+]
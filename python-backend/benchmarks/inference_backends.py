@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.corpus import CORPUS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Beam search without sampling so differences between backends come from numerics, not randomness
+BENCHMARK_GENERATION_KWARGS = {
+    "max_length": 64,
+    "num_beams": 4,
+    "early_stopping": True,
+    "no_repeat_ngram_size": 2
+}
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_backend(backend, model_name, repeats, threads):
+    """Load the model with one backend and time every corpus question; runs in its own process"""
+    import torch
+    from transformers import T5ForConditionalGeneration, T5Tokenizer
+    from inference_backends import prepare_model
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    baseline_rss = current_rss_mb()
+    load_start = time.perf_counter()
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model, inference_context = prepare_model(T5ForConditionalGeneration.from_pretrained(model_name), backend)
+    load_seconds = time.perf_counter() - load_start
+
+    pairs = [(item["paragraph"], answer) for item in CORPUS for answer in item["answers"]]
+
+    def generate(context, answer):
+        input_ids = tokenizer.encode(f"context: {context} answer: {answer}", return_tensors="pt", max_length=512, truncation=True)
+        with torch.no_grad(), inference_context():
+            outputs = model.generate(input_ids, **BENCHMARK_GENERATION_KWARGS)
+        return tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
+
+    # Warm-up also triggers compilation for the compile backend
+    warmup_start = time.perf_counter()
+    generate(*pairs[0])
+    warmup_seconds = time.perf_counter() - warmup_start
+
+    latencies = []
+    questions = []
+    for _ in range(repeats):
+        questions = []
+        for context, answer in pairs:
+            start = time.perf_counter()
+            questions.append(generate(context, answer))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": backend,
+        "loadSeconds": load_seconds,
+        "warmupSeconds": warmup_seconds,
+        "latencyMs": {
+            "mean": statistics.mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99)
+        },
+        "modelRssMb": current_rss_mb() - baseline_rss,
+        "rssMb": current_rss_mb(),
+        "peakRssMb": peak_rss_mb(),
+        "questions": questions
+    }
+
+
+def question_overlap(reference, candidate):
+    """Token F1 between two generated questions"""
+    reference_tokens = re.findall(r'\w+', reference.lower())
+    candidate_tokens = re.findall(r'\w+', candidate.lower())
+    if not reference_tokens or not candidate_tokens:
+        return float(reference_tokens == candidate_tokens)
+    common = sum(min(reference_tokens.count(token), candidate_tokens.count(token)) for token in set(candidate_tokens))
+    if common == 0:
+        return 0.0
+    precision = common / len(candidate_tokens)
+    recall = common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_in_subprocess(backend, args):
+    # A fresh process per backend keeps resident memory measurements independent
+    command = [
+        sys.executable, '-m', 'benchmarks.inference_backends', '--worker',
+        '--backend', backend, '--model', args.model, '--repeats', str(args.repeats), '--threads', str(args.threads)
+    ]
+    result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"backend": backend, "error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    from inference_backends import INFERENCE_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Compare CPU inference backends for the T5 question generator")
+    parser.add_argument('--model', default=os.environ.get('T5_MODEL_NAME', "iarfmoose/t5-base-question-generator"))
+    parser.add_argument('--backends', default=','.join(INFERENCE_BACKENDS), help="comma separated backends; fp32 is always included")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=0, help="torch intra-op threads (0 keeps the torch default)")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--backend', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.backend, args.model, args.repeats, args.threads)))
+        return
+
+    backends = ['fp32'] + [backend for backend in args.backends.split(',') if backend and backend != 'fp32']
+    results = [run_in_subprocess(backend, args) for backend in backends]
+
+    # Quality: how closely each backend's questions match the fp32 reference
+    reference = results[0].get("questions", [])
+    for result in results:
+        questions = result.pop("questions", None)
+        if questions is None or not reference:
+            continue
+        overlaps = [question_overlap(ref, question) for ref, question in zip(reference, questions)]
+        result["questionOverlapVsFp32"] = statistics.mean(overlaps)
+        result["exactMatchVsFp32"] = sum(ref == question for ref, question in zip(reference, questions)) / len(reference)
+
+    report = {"model": args.model, "repeats": args.repeats, "questionsPerRun": len(reference), "results": results}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BACKEND_DIR)
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.corpus import CORPUS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_tag(text):
+    """Tagging as text analysis did it before NLP backends: three NLTK calls per paragraph"""
+    from nltk.tag import pos_tag
+    from nltk.tokenize import sent_tokenize, word_tokenize
+    from nlp_backends import TaggedText
+
+    tokens = tuple(word_tokenize(text))
+    return TaggedText(tuple(sent_tokenize(text)), tokens, tuple(pos_tag(tokens)))
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def extraction(tagged_texts, texts, stop_words):
+    from text_analysis import TextAnalysis
+    return [
+        TextAnalysis(text, stop_words, tagged=tagged)
+        for text, tagged in zip(texts, tagged_texts)
+    ]
+
+
+def run_backend(name, texts, args):
+    """Documents per second of one backend, in process and on a process pool"""
+    from nlp_backends import NlpProcessPool, create_nlp_backend
+
+    options = {"data_dir": args.nltk_data_dir, "model": args.spacy_model}
+    load_start = time.perf_counter()
+    backend = create_nlp_backend(name, **options)
+    load_seconds = time.perf_counter() - load_start
+    backend.tag_one(texts[0])
+
+    start = time.perf_counter()
+    tagged = list(backend.tag(texts, args.batch_size))
+    elapsed = time.perf_counter() - start
+    result = {"backend": name, "loadSeconds": load_seconds, "docsPerSecond": len(texts) / elapsed, "tagged": tagged}
+
+    for processes in args.processes:
+        pool = NlpProcessPool(name, options, processes, batch_size=args.batch_size)
+        # Worker start-up and model loading are excluded; the pool is long-lived in the service
+        pool.tag(texts[:processes])
+        start = time.perf_counter()
+        pool_tagged = pool.tag(texts)
+        result[f"docsPerSecondProcesses{processes}"] = len(texts) / (time.perf_counter() - start)
+        result[f"matchesInProcessProcesses{processes}"] = pool_tagged == tagged
+        pool.shutdown()
+    return result
+
+
+def main():
+    from nlp_backends import NLP_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Compare NLP backends for text analysis in documents per second")
+    parser.add_argument('--backends', default=','.join(NLP_BACKENDS))
+    parser.add_argument('--documents', type=int, default=300, help="documents tagged per run, cycling through the corpus")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--processes', default=str(os.cpu_count() or 1), help="comma separated process pool sizes to time")
+    parser.add_argument('--spacy-model', default=os.environ.get('NLP_SPACY_MODEL', 'en_core_web_sm'))
+    parser.add_argument('--nltk-data-dir', default=os.environ.get('NLTK_DATA_DIR', os.path.join(BACKEND_DIR, 'nltk_data')))
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    args = parser.parse_args()
+    args.processes = [int(count) for count in args.processes.split(',') if int(count) > 1]
+
+    from startup import load_nltk_resources
+    stop_words = load_nltk_resources(args.nltk_data_dir)
+    paragraphs = [item["paragraph"] for item in CORPUS]
+    texts = [paragraphs[i % len(paragraphs)] for i in range(args.documents)]
+
+    # Reference: one pos_tag call per paragraph, as before
+    start = time.perf_counter()
+    reference = [legacy_tag(text) for text in texts]
+    results = [{"backend": "nltk-legacy", "docsPerSecond": len(texts) / (time.perf_counter() - start)}]
+    reference_analyses = extraction(reference[:len(paragraphs)], paragraphs, stop_words)
+
+    for name in [backend for backend in args.backends.split(',') if backend]:
+        try:
+            result = run_backend(name, texts, args)
+        except Exception as e:
+            results.append({"backend": name, "error": str(e)})
+            continue
+        # Equivalence: key entities and noun phrases against the legacy path
+        analyses = extraction(result.pop("tagged")[:len(paragraphs)], paragraphs, stop_words)
+        result["keyEntitiesJaccard"] = statistics.mean(
+            jaccard(ref.key_entities, analysis.key_entities) for ref, analysis in zip(reference_analyses, analyses)
+        )
+        result["nounPhrasesJaccard"] = statistics.mean(
+            jaccard(ref.noun_phrases, analysis.noun_phrases) for ref, analysis in zip(reference_analyses, analyses)
+        )
+        result["identicalExtraction"] = all(
+            (ref.key_entities, ref.noun_phrases) == (analysis.key_entities, analysis.noun_phrases)
+            for ref, analysis in zip(reference_analyses, analyses)
+        )
+        results.append(result)
+
+    report = {"documents": len(texts), "batchSize": args.batch_size, "results": results}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BACKEND_DIR)
+    main()
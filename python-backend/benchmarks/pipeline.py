@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import CORPUS
+from benchmarks.inference_backends import peak_rss_mb, percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metrics compared between runs; latency regresses upwards, throughput downwards
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+def build_tiny_model(output_dir, seed=0):
+    """Randomly initialized two-layer T5 with a sentencepiece tokenizer trained on the corpus"""
+    import sentencepiece
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration, T5Tokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    sentencepiece.set_random_generator_seed(seed)
+    sentences = [sentence for item in CORPUS for sentence in item["paragraph"].split('. ')]
+    sentencepiece.SentencePieceTrainer.train(
+        sentence_iterator=iter(sentences * 4),
+        model_prefix=os.path.join(output_dir, 'spiece'),
+        vocab_size=512,
+        hard_vocab_limit=False,
+        pad_id=0, eos_id=1, unk_id=2, bos_id=-1,
+        num_threads=1,
+        minloglevel=2
+    )
+    tokenizer = T5Tokenizer(os.path.join(output_dir, 'spiece.model'), extra_ids=0)
+
+    torch.manual_seed(seed)
+    config = T5Config(
+        vocab_size=len(tokenizer), d_model=64, d_ff=128, d_kv=16,
+        num_layers=2, num_heads=4, decoder_start_token_id=tokenizer.pad_token_id
+    )
+    tokenizer.save_pretrained(output_dir)
+    T5ForConditionalGeneration(config).save_pretrained(output_dir, safe_serialization=True)
+    return output_dir
+
+
+def latency_summary(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "throughputPerSecond": len(latencies) / elapsed if elapsed else 0,
+        "latencyMs": {
+            "mean": statistics.mean(latencies) if latencies else 0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99)
+        }
+    }
+
+
+def timed_runs(calls, repeats):
+    """Run every call `repeats` times and summarize per-call latency and overall throughput"""
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for call in calls:
+            call_start = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - call_start) * 1000)
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+def stage_breakdown(backend, before):
+    """Time spent per pipeline stage since `before`, from the backend's stage histograms"""
+    stages = {}
+    for labels, (total, count) in backend.metrics.histogram_totals('quiz_stage_seconds').items():
+        previous_total, previous_count = before.get(labels, (0.0, 0))
+        if count > previous_count:
+            stages[dict(labels)["stage"]] = {
+                "calls": count - previous_count,
+                "totalMs": (total - previous_total) * 1000,
+                "meanMs": (total - previous_total) * 1000 / (count - previous_count)
+            }
+    return stages
+
+
+def run_benchmark(args):
+    """Load the backend with the chosen model and time each scenario over the fixed corpus"""
+    if args.model == 'tiny':
+        model_dir = build_tiny_model(args.tiny_dir or tempfile.mkdtemp(prefix='tiny-t5-'), args.seed)
+    else:
+        model_dir = args.model
+
+    # Cold caches by default so runs measure the pipeline rather than cache hits
+    os.environ['T5_MODEL_DIR'] = model_dir
+    os.environ['T5_LOAD_ON_IMPORT'] = '0'
+    if not args.warm_caches:
+        os.environ['GENERATION_CACHE_ENABLED'] = '0'
+        os.environ['TEXT_ANALYSIS_CACHE_SIZE'] = '0'
+        os.environ['QUIZ_RESPONSE_CACHE_TTL'] = '0'
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    import app as backend
+    load_start = time.perf_counter()
+    backend.load_models()
+    load_seconds = time.perf_counter() - load_start
+
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    client = backend.app.test_client()
+    scenarios = {}
+    stages = {}
+
+    def pipeline_call(paragraph):
+        def call():
+            analysis = backend.analyze_text(paragraph)
+            key_entities, noun_phrases = backend.extract_key_entities(paragraph, analysis)
+            backend.create_comprehensive_questions(paragraph, key_entities, noun_phrases, args.question_count, analysis)
+        return call
+
+    def post(path, body):
+        def call():
+            response = client.post(path, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} answered {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return response.get_json()
+        return call
+
+    for item in CORPUS:
+        before = backend.metrics.histogram_totals('quiz_stage_seconds')
+        scenarios[f"pipeline/{item['name']}"] = timed_runs([pipeline_call(item["paragraph"])], args.repeats)
+        stages[f"pipeline/{item['name']}"] = stage_breakdown(backend, before)
+
+    before = backend.metrics.histogram_totals('quiz_stage_seconds')
+    quiz_bodies = [{"paragraph": item["paragraph"], "questionCount": args.question_count} for item in CORPUS]
+    scenarios["route/generate-quiz"] = timed_runs([post('/generate-quiz', body) for body in quiz_bodies], args.repeats)
+    stages["route/generate-quiz"] = stage_breakdown(backend, before)
+
+    scenarios["route/generate-quiz-keyword"] = timed_runs(
+        [post('/generate-quiz-keyword', {"keyword": item["name"], "questionCount": args.question_count}) for item in CORPUS],
+        args.repeats
+    )
+
+    # Score every corpus quiz against seeded random answers
+    performance_bodies = []
+    for body in quiz_bodies:
+        quiz = post('/generate-quiz', body)()
+        answers = {str(i): random.randrange(len(question["options"])) for i, question in enumerate(quiz["questions"])}
+        performance_bodies.append({"quiz": quiz, "userAnswers": answers, "timeSpent": 60 * len(answers)})
+    scenarios["route/analyze-performance"] = timed_runs(
+        [post('/analyze-performance', body) for body in performance_bodies],
+        args.repeats
+    )
+
+    if backend.generation_scheduler is not None:
+        backend.generation_scheduler.stop()
+
+    return {
+        "model": args.model,
+        "modelDir": model_dir,
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "questionCount": args.question_count,
+        "warmCaches": args.warm_caches,
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+            "inferenceBackend": backend.T5_INFERENCE_BACKEND,
+            "cpuCount": os.cpu_count()
+        },
+        "loadSeconds": load_seconds,
+        "peakRssMb": peak_rss_mb(),
+        "scenarios": scenarios,
+        "stages": stages
+    }
+
+
+def compare_reports(baseline, current, threshold):
+    """Relative change of every scenario between two reports, flagging moves worse than `threshold`"""
+    def change(before, after):
+        return (after - before) / before if before else 0.0
+
+    scenarios = {}
+    regressions = []
+    for name, after in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        deltas = {key: change(before["latencyMs"][key], after["latencyMs"][key]) for key in LATENCY_KEYS}
+        deltas["throughputPerSecond"] = change(before["throughputPerSecond"], after["throughputPerSecond"])
+        scenarios[name] = deltas
+        for key in LATENCY_KEYS:
+            if deltas[key] > threshold:
+                regressions.append(f"{name} {key} latency +{deltas[key]:.1%}")
+        if deltas["throughputPerSecond"] < -threshold:
+            regressions.append(f"{name} throughput {deltas['throughputPerSecond']:.1%}")
+
+    rss_change = change(baseline["peakRssMb"], current["peakRssMb"])
+    if rss_change > threshold:
+        regressions.append(f"peak RSS +{rss_change:.1%}")
+
+    return {"threshold": threshold, "peakRssMb": rss_change, "scenarios": scenarios, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-reproducible benchmark of the quiz generation pipeline")
+    parser.add_argument('--model', default='tiny', help="'tiny' for a random offline T5, or a local checkpoint directory")
+    parser.add_argument('--tiny-dir', help="where to write the tiny model (a temporary directory by default)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--question-count', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=0, help="torch intra-op threads (0 keeps the torch default)")
+    parser.add_argument('--warm-caches', action='store_true', help="keep the analysis and generation caches enabled")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="compare two reports instead of running")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as baseline_file, open(args.compare[1]) as current_file:
+            comparison = compare_reports(json.load(baseline_file), json.load(current_file), args.threshold)
+        print(json.dumps(comparison, indent=2))
+        sys.exit(1 if comparison["regressions"] else 0)
+
+    output = json.dumps(run_benchmark(args), indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BACKEND_DIR)
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared with forked workers in prefork mode
+model = None
+tokenizer = None
+
+
+def load(model_name):
+    global model, tokenizer
+    from transformers import T5ForConditionalGeneration, T5Tokenizer
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = T5ForConditionalGeneration.from_pretrained(model_name)
+
+
+def worker(role, load_in_worker, model_name, model_processes, barrier, results):
+    import torch
+    from prefork import configure_worker_threads, freeze_for_fork, memory_usage
+
+    if load_in_worker:
+        load(model_name)
+        freeze_for_fork(model)
+    configure_worker_threads(model_processes)
+
+    # Serve a request so every worker has touched the weights it needs
+    input_ids = tokenizer.encode("context: Water evaporates and falls as rain. answer: rain", return_tensors="pt")
+    with torch.no_grad():
+        model.generate(input_ids, max_length=32, num_beams=4)
+
+    # Measure while every worker and the parent are alive, otherwise PSS would not reflect the sharing
+    barrier.wait()
+    results.put((role, memory_usage()))
+    barrier.wait()
+
+
+def measure(mode, model_name, workers, job_workers):
+    """Start `workers` forked web workers and `job_workers` spawned job workers, and report their and the
+    parent's memory once all have served a generation"""
+    from prefork import memory_usage
+
+    load_in_worker = mode == 'independent'
+    if not load_in_worker:
+        from prefork import freeze_for_fork
+        load(model_name)
+        freeze_for_fork(model)
+
+    # Job workers are spawned by the dispatcher and load their own copy in both modes
+    fork, spawn = multiprocessing.get_context('fork'), multiprocessing.get_context('spawn')
+    model_processes = workers + job_workers
+    # The parent joins the barrier so it is measured at the same moment as its workers
+    barrier = spawn.Barrier(model_processes + 1)
+    results = spawn.Queue()
+    processes = [
+        fork.Process(target=worker, args=('web', load_in_worker, model_name, model_processes, barrier, results))
+        for _ in range(workers)
+    ] + [
+        spawn.Process(target=worker, args=('job', True, model_name, model_processes, barrier, results))
+        for _ in range(job_workers)
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    # In prefork mode the parent plays the gunicorn master and holds its share of the model pages
+    master = memory_usage()
+    usages = [results.get() for _ in processes]
+    barrier.wait()
+    for process in processes:
+        process.join()
+
+    def mean_usage(role):
+        role_usages = [usage for usage_role, usage in usages if usage_role == role]
+        if not role_usages:
+            return None
+        return {key: statistics.mean(usage[key] for usage in role_usages) for key in ("rss", "pss", "uss")}
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "jobWorkers": job_workers,
+        "perWorkerMb": mean_usage('web'),
+        "perJobWorkerMb": mean_usage('job'),
+        "masterMb": master,
+        "totalPssMb": master["pss"] + sum(usage["pss"] for _, usage in usages)
+    }
+
+
+def run_in_subprocess(mode, args):
+    import subprocess
+    command = [
+        sys.executable, '-m', 'benchmarks.prefork_memory', '--worker-mode', mode,
+        '--model', args.model, '--workers', str(args.workers), '--job-workers', str(args.job_workers)
+    ]
+    result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory with independent model loads vs. pre-fork sharing")
+    parser.add_argument('--model', default=os.environ.get('T5_MODEL_NAME', "iarfmoose/t5-base-question-generator"))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--job-workers', type=int, default=int(os.environ.get('JOB_WORKERS', 1)),
+                        help="job worker processes, each loading its own model as under the job dispatcher")
+    parser.add_argument('--worker-mode', choices=('independent', 'prefork'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_mode:
+        print(json.dumps(measure(args.worker_mode, args.model, args.workers, args.job_workers)))
+        return
+
+    # Each mode runs in a fresh interpreter so the two measurements don't share pages
+    report = {
+        "model": args.model,
+        "before": run_in_subprocess('independent', args),
+        "after": run_in_subprocess('prefork', args)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BACKEND_DIR)
+    main()
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class DistractorEngine:
+    """Character n-gram TF-IDF index over a paragraph's noun phrases and key entities"""
+
+    def __init__(self, candidates, ngram_range=(2, 4), max_similarity=0.9):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        # Case-insensitive dedup keeps every option distinct
+        self.candidates = []
+        seen = set()
+        for candidate in candidates:
+            key = candidate.strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                self.candidates.append(candidate.strip())
+        self.candidates_lower = np.array([candidate.lower() for candidate in self.candidates], dtype=str)
+        self.max_similarity = max_similarity
+
+        self.vectorizer = None
+        self.matrix = None
+        if self.candidates:
+            self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=ngram_range, lowercase=True)
+            self.matrix = self.vectorizer.fit_transform(self.candidates)
+
+    def distractors_for(self, answers, count=3):
+        """Pick, for every answer in one pass, the most similar candidates that are neither the answer nor each other"""
+        if not answers:
+            return []
+        if self.matrix is None:
+            return [[] for _ in answers]
+
+        # Rows are L2-normalized, so the sparse product is the cosine similarity of every answer/candidate pair
+        similarity = (self.vectorizer.transform(answers) @ self.matrix.T).toarray()
+
+        # Exclude the answer itself, candidates overlapping it, and near-copies such as plural forms;
+        # substring tests are broadcast over the answers x candidates grid
+        answers_lower = np.array([answer.strip().lower() for answer in answers], dtype=str)[:, None]
+        candidates_lower = self.candidates_lower[None, :]
+        overlapping = (np.char.find(answers_lower, candidates_lower) >= 0) | (np.char.find(candidates_lower, answers_lower) >= 0)
+        similarity[overlapping | (similarity >= self.max_similarity)] = -np.inf
+
+        ranked = np.argsort(-similarity, axis=1)
+        picks = []
+        for row, row_columns in enumerate(ranked):
+            chosen = []
+            for column in row_columns:
+                if len(chosen) == count or not np.isfinite(similarity[row, column]):
+                    break
+                if not self._near_any(column, chosen):
+                    chosen.append(column)
+            picks.append([self.candidates[column] for column in chosen])
+        return picks
+
+    def _near_any(self, column, chosen):
+        """Whether a candidate overlaps, or is a near-copy of, a distractor already chosen for the same answer"""
+        if not chosen:
+            return False
+        candidate = self.candidates_lower[column]
+        if any(candidate in self.candidates_lower[other] or self.candidates_lower[other] in candidate for other in chosen):
+            return True
+        return bool(((self.matrix[column] @ self.matrix[chosen].T).toarray() >= self.max_similarity).any())
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_connections import ThreadLocalConnections
+
+logger = logging.getLogger(__name__)
+
+
+def generation_cache_key(context, answer, model_name, generation_kwargs):
+    """Content-addressed key for one (context, answer) generation"""
+    payload = json.dumps(
+        [model_name, generation_kwargs, context, answer],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """Two-tier cache of generated questions: an in-memory LRU backed by a shared SQLite file"""
+
+    def __init__(self, path=None, max_memory_bytes=8 * 1024 * 1024, max_disk_entries=100000):
+        self.path = path or None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._connections = ThreadLocalConnections(self.path) if self.path else None
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.path:
+            try:
+                self._connection().execute(
+                    "CREATE TABLE IF NOT EXISTS generations ("
+                    "key TEXT PRIMARY KEY, question TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._connection().commit()
+            except sqlite3.Error as e:
+                logger.error(f"Disabling on-disk generation cache at {self.path}: {str(e)}")
+                self.path = None
+
+    def _connection(self):
+        return self._connections.get()
+
+    def get_many(self, keys):
+        """Look up keys and return a dict of the ones that are cached"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                question = self._memory.get(key)
+                if question is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = question
+                else:
+                    missing.append(key)
+            self.memory_hits += len(found)
+
+        if missing and self.path:
+            try:
+                placeholders = ','.join('?' * len(missing))
+                rows = self._connection().execute(
+                    f"SELECT key, question FROM generations WHERE key IN ({placeholders})", missing
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading generation cache: {str(e)}")
+                rows = []
+            with self._lock:
+                self.disk_hits += len(rows)
+                for key, question in rows:
+                    found[key] = question
+                    self._remember(key, question)
+
+        with self._lock:
+            self.misses += len(set(keys) - set(found))
+        return found
+
+    def put_many(self, items):
+        """Store (key, question) pairs in both tiers"""
+        items = [(key, question) for key, question in items if question]
+        if not items:
+            return
+        with self._lock:
+            for key, question in items:
+                self._remember(key, question)
+
+        if self.path:
+            try:
+                connection = self._connection()
+                now = time.time()
+                connection.executemany(
+                    "INSERT OR REPLACE INTO generations (key, question, created_at) VALUES (?, ?, ?)",
+                    [(key, question, now) for key, question in items]
+                )
+                self._writes_since_prune += len(items)
+                if self._writes_since_prune >= 1000:
+                    self._writes_since_prune = 0
+                    self._prune(connection)
+                connection.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing generation cache: {str(e)}")
+
+    def _remember(self, key, question):
+        # Caller holds the lock; evict least recently used entries until under the byte budget
+        if key in self._memory:
+            self._memory_bytes -= len(key) + len(self._memory.pop(key))
+        self._memory[key] = question
+        self._memory_bytes += len(key) + len(question)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            old_key, old_question = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_key) + len(old_question)
+
+    def _prune(self, connection):
+        count = connection.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        if count > self.max_disk_entries:
+            connection.execute(
+                "DELETE FROM generations WHERE key IN "
+                "(SELECT key FROM generations ORDER BY created_at LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+
+    def stats(self):
+        """Hit/miss counters and memory tier usage"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_enabled": bool(self.path)
+            }
@@ -0,0 +1,99 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GenerationScheduler:
+    """Single inference worker that merges generation jobs from all requests into micro-batches"""
+
+    def __init__(self, generate_fn, max_batch_size=8, max_wait_ms=10):
+        self.generate_fn = generate_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0, float(max_wait_ms))
+        self._queue = queue.Queue()
+        self._worker = None
+        self.batches_run = 0
+        self.items_run = 0
+
+    def start(self):
+        """Start the inference worker thread"""
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="t5-generation-scheduler", daemon=True)
+            self._worker.start()
+            logger.info(f"Generation scheduler started (max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms})")
+
+    def stop(self):
+        """Stop the worker after the jobs already queued have been processed"""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join()
+        self._worker = None
+
+    @property
+    def queue_depth(self):
+        """Number of generation jobs waiting for the worker"""
+        return self._queue.qsize()
+
+    def submit(self, pairs, options=None):
+        """Queue (context, answer) pairs and return one future per pair; only jobs with equal options share a batch"""
+        futures = []
+        for pair in pairs:
+            future = Future()
+            self._queue.put((pair, future, options))
+            futures.append(future)
+        return futures
+
+    def _collect_batch(self, first):
+        """Gather queued jobs until the batch is full or max_wait_ms has passed"""
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect_batch(first)
+            self._dispatch(batch)
+            if stop:
+                break
+
+    def _dispatch(self, batch):
+        # Drop jobs whose requester has already given up on them, then run one call per options group
+        groups = {}
+        for pair, future, options in batch:
+            if future.set_running_or_notify_cancel():
+                groups.setdefault(options, []).append((pair, future))
+
+        for options, group in groups.items():
+            try:
+                pairs = [pair for pair, _ in group]
+                results = self.generate_fn(pairs, options)
+            except Exception as e:
+                logger.error(f"Error running generation batch: {str(e)}")
+                for _, future in group:
+                    future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.items_run += len(group)
+            for (_, future), result in zip(group, results):
+                future.set_result(result)
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+
+# Pre-fork serving: the T5 model is loaded once in the master and forked workers share its
+# weight pages copy-on-write instead of each holding their own copy
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('GUNICORN_WORKERS', max(1, (os.cpu_count() or 1) // 2)))
+# Every admitted, queued or coalesced generation request holds a server thread, so threads beyond those
+# stay free for /health, /generate-quiz-keyword and /analyze-performance during a generation burst
+model_threads = (
+    int(os.environ.get('ADMISSION_MAX_CONCURRENT', 2)) +
+    int(os.environ.get('ADMISSION_MAX_QUEUE', 8)) +
+    int(os.environ.get('ADMISSION_MAX_FOLLOWERS', 32))
+)
+threads = int(os.environ.get('GUNICORN_THREADS', model_threads + int(os.environ.get('GUNICORN_RESERVED_THREADS', 4))))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+# The master loads synchronously in on_starting; a background loader thread would not survive fork
+os.environ['T5_LOAD_ON_IMPORT'] = '0'
+
+# Bulk jobs live in SQLite and run on one dispatcher process and worker pool started by the master,
+# instead of a dispatcher and T5 pool inside every web worker
+os.environ['JOB_DISPATCHER'] = 'external'
+job_dispatcher_process = None
+
+# Job workers each hold their own T5 copy next to the shared one, so keep the pool small and split the
+# cores between web and job workers instead of giving each job worker cpu_count / JOB_WORKERS threads
+os.environ.setdefault('JOB_WORKERS', '1')
+model_processes = workers + int(os.environ['JOB_WORKERS'])
+os.environ.setdefault('JOB_TORCH_THREADS', str(max(1, (os.cpu_count() or 1) // model_processes)))
+
+
+def on_starting(server):
+    import app
+    from prefork import freeze_for_fork, memory_usage
+
+    # No warm-up or scheduler thread in the master: inference and threads stay in the workers
+    app.load_models(start_scheduler=False, warmup=False)
+    freeze_for_fork(app.question_generator)
+    server.log.info(f"Model loaded in master before fork: {memory_usage()}")
+
+
+def when_ready(server):
+    global job_dispatcher_process
+    import app
+    from jobs import run_job_dispatcher
+
+    # Spawned rather than forked, so it holds neither the master's model nor its sockets
+    job_dispatcher_process = multiprocessing.get_context('spawn').Process(
+        target=run_job_dispatcher,
+        args=(app.JOB_STORE_PATH,),
+        kwargs=app.job_dispatcher_options,
+        name='job-dispatcher'
+    )
+    job_dispatcher_process.start()
+    server.log.info(f"Started job dispatcher process {job_dispatcher_process.pid}")
+
+
+def on_exit(server):
+    if job_dispatcher_process is not None:
+        job_dispatcher_process.terminate()
+        job_dispatcher_process.join(timeout=10)
+
+
+def post_fork(server, worker):
+    import app
+    from prefork import configure_worker_threads
+
+    configure_worker_threads(model_processes, int(os.environ.get('TORCH_THREADS_PER_WORKER', 0)) or None)
+    # The master reported ready before fork; the worker is only ready once warmed up with its scheduler running
+    app.startup_state.begin("warming_up")
+    if app.T5_WARMUP:
+        app.warm_up()
+    if app.T5_SCHEDULER_ENABLED:
+        app.start_generation_scheduler()
+    app.startup_state.ready()
@@ -0,0 +1,40 @@
+import logging
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKENDS = ('fp32', 'int8', 'bf16', 'compile')
+
+
+def prepare_model(model, backend='fp32'):
+    """Convert a loaded T5 model for a CPU inference backend, returning (model, context factory for generate())"""
+    import torch
+
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of: {', '.join(INFERENCE_BACKENDS)}")
+
+    model.eval()
+
+    if backend == 'int8':
+        # Dynamic quantization: Linear weights stored as int8, activations quantized on the fly
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model, nullcontext
+
+    if backend == 'bf16':
+        if not torch.backends.mkldnn.is_available():
+            logger.warning("bf16 autocast needs oneDNN support, falling back to fp32")
+            return model, nullcontext
+        return model, lambda: torch.autocast('cpu', dtype=torch.bfloat16)
+
+    if backend == 'compile':
+        if not hasattr(torch, 'compile'):
+            logger.warning("torch.compile is not available in this torch version, falling back to fp32")
+            return model, nullcontext
+        try:
+            # generate() drives the model step by step, so compile forward with dynamic sequence lengths
+            model.forward = torch.compile(model.forward, dynamic=True)
+        except Exception as e:
+            logger.warning(f"torch.compile failed, falling back to fp32: {str(e)}")
+        return model, nullcontext
+
+    return model, nullcontext
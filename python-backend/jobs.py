@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from functools import partial
+
+from process_pool import LazyProcessPool
+from sqlite_connections import ThreadLocalConnections
+
+logger = logging.getLogger(__name__)
+
+# Backend module inside each worker process, loaded once by init_job_worker
+worker_backend = None
+
+
+def init_job_worker(torch_threads):
+    """Preload the T5 model once per worker process"""
+    global worker_backend
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    # The worker loads synchronously below instead of in the background on import
+    os.environ['T5_LOAD_ON_IMPORT'] = '0'
+    import app as backend
+    backend.load_models(start_scheduler=False)
+    worker_backend = backend
+
+
+def run_job_item(paragraph, question_count):
+    """Generate one quiz inside a worker process"""
+    backend = worker_backend
+    if len(paragraph) < 100:
+        raise ValueError("Paragraph should be at least 100 characters long")
+    analysis = backend.analyze_text(paragraph)
+    key_entities, noun_phrases = backend.extract_key_entities(paragraph, analysis)
+    questions = backend.create_comprehensive_questions(paragraph, key_entities, noun_phrases, question_count, analysis)
+    return backend.build_paragraph_quiz(paragraph, key_entities, noun_phrases, questions, len(questions))
+
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, status TEXT NOT NULL, question_count INTEGER NOT NULL, item_count INTEGER NOT NULL, "
+    "cancelled INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL)",
+    "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)",
+    "CREATE TABLE IF NOT EXISTS job_items ("
+    "job_id TEXT NOT NULL, idx INTEGER NOT NULL, paragraph TEXT NOT NULL, quiz TEXT, error TEXT, "
+    "PRIMARY KEY (job_id, idx))"
+)
+
+
+class JobStore:
+    """Bulk jobs and their per-paragraph results in SQLite, shared by every web worker and the dispatcher"""
+
+    def __init__(self, path, max_retained=100):
+        self.path = path
+        self.max_retained = max_retained
+        self._connections = ThreadLocalConnections(path)
+        connection = self._connection()
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+
+    def _connection(self):
+        return self._connections.get()
+
+    def create(self, paragraphs, question_count):
+        """Queue a job for the dispatcher and return its id"""
+        job_id = uuid.uuid4().hex
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO jobs (id, status, question_count, item_count, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, question_count, len(paragraphs), time.time())
+            )
+            connection.executemany(
+                "INSERT INTO job_items (job_id, idx, paragraph) VALUES (?, ?, ?)",
+                [(job_id, index, paragraph) for index, paragraph in enumerate(paragraphs)]
+            )
+            self._evict_finished(connection)
+        return job_id
+
+    def _evict_finished(self, connection):
+        # Drop the oldest finished jobs beyond the retention limit
+        count = connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        if count <= self.max_retained:
+            return
+        evicted = [row[0] for row in connection.execute(
+            "SELECT id FROM jobs WHERE finished_at IS NOT NULL ORDER BY created_at LIMIT ?", (count - self.max_retained,)
+        )]
+        connection.executemany("DELETE FROM job_items WHERE job_id = ?", [(job_id,) for job_id in evicted])
+        connection.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in evicted])
+
+    def get(self, job_id, include_results=True):
+        """Status, progress and errors of a job, plus its finished quizzes; None for an unknown id"""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT status, question_count, item_count, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, question_count, total, created_at, started_at, finished_at = row
+        completed, failed = connection.execute(
+            "SELECT COUNT(quiz), COUNT(error) FROM job_items WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        errors = connection.execute(
+            "SELECT idx, error FROM job_items WHERE job_id = ? AND error IS NOT NULL ORDER BY idx", (job_id,)
+        ).fetchall()
+        data = {
+            "id": job_id,
+            "status": status,
+            "progress": {
+                "total": total,
+                "completed": completed,
+                "failed": failed,
+                "percent": ((completed + failed) / total * 100) if total else 100
+            },
+            "questionCount": question_count,
+            "createdAt": created_at,
+            "startedAt": started_at,
+            "finishedAt": finished_at,
+            "errors": [{"index": index, "error": error} for index, error in errors]
+        }
+        if include_results:
+            data["results"] = list(self.results(job_id))
+        return data
+
+    def results(self, job_id):
+        """Completed quizzes of a job in input order"""
+        rows = self._connection().execute(
+            "SELECT idx, quiz FROM job_items WHERE job_id = ? AND quiz IS NOT NULL ORDER BY idx", (job_id,)
+        )
+        for index, quiz in rows:
+            yield {"index": index, "quiz": json.loads(quiz)}
+
+    def cancel(self, job_id):
+        """Ask the dispatcher to stop dispatching the remaining items of a job"""
+        connection = self._connection()
+        with connection:
+            connection.execute("UPDATE jobs SET cancelled = 1 WHERE id = ?", (job_id,))
+        return self.get(job_id, include_results=False)
+
+    def is_cancelled(self, job_id):
+        row = self._connection().execute("SELECT cancelled FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or bool(row[0])
+
+    def claim_next(self):
+        """Mark the oldest queued job running and return (job_id, question_count), or None"""
+        connection = self._connection()
+        with connection:
+            row = connection.execute(
+                "SELECT id, question_count FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (time.time(), row[0])
+                )
+        return row
+
+    def requeue_running(self):
+        """Queue jobs a previous dispatcher left running again; only their unfinished items are dispatched"""
+        connection = self._connection()
+        with connection:
+            return connection.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def pending_items(self, job_id):
+        return self._connection().execute(
+            "SELECT idx, paragraph FROM job_items WHERE job_id = ? AND quiz IS NULL AND error IS NULL ORDER BY idx",
+            (job_id,)
+        ).fetchall()
+
+    def record(self, job_id, index, quiz=None, error=None):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "UPDATE job_items SET quiz = ?, error = ? WHERE job_id = ? AND idx = ?",
+                (json.dumps(quiz) if error is None else None, error, job_id, index)
+            )
+
+    def finish(self, job_id):
+        """Set the final status of a job from its item outcomes and return it"""
+        connection = self._connection()
+        with connection:
+            cancelled, completed, failed = connection.execute(
+                "SELECT j.cancelled, COUNT(i.quiz), COUNT(i.error) FROM jobs j "
+                "LEFT JOIN job_items i ON i.job_id = j.id WHERE j.id = ?", (job_id,)
+            ).fetchone()
+            if cancelled:
+                status = "cancelled"
+            elif failed and not completed:
+                status = "failed"
+            else:
+                status = "completed"
+            connection.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?", (status, time.time(), job_id))
+        return status, completed, failed
+
+
+class JobDispatcher:
+    """Single dispatcher that runs queued jobs on a pool of worker processes that each hold their own T5 model"""
+
+    def __init__(self, store, workers=None, max_in_flight=None, torch_threads=None, start_method="spawn", poll_interval=0.5):
+        self.store = store
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_in_flight = max(1, max_in_flight or self.workers * 2)
+        self.poll_interval = poll_interval
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Worker processes are only started once the first job arrives
+        self._pool = LazyProcessPool(
+            self.workers,
+            initializer=init_job_worker,
+            initargs=(torch_threads or max(1, (os.cpu_count() or 1) // self.workers),),
+            start_method=start_method,
+            name="job worker"
+        )
+
+    def start(self):
+        """Run the dispatcher on a background thread of this process"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="job-dispatcher", daemon=True)
+                self._thread.start()
+
+    def run(self):
+        """Claim queued jobs until stopped"""
+        requeued = self.store.requeue_running()
+        if requeued:
+            logger.info(f"Resuming {requeued} jobs left running by a previous dispatcher")
+        while not self._stop.is_set():
+            claimed = self.store.claim_next()
+            if claimed is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            job_id, question_count = claimed
+            threading.Thread(target=self._dispatch, args=(job_id, question_count), name=f"job-{job_id[:8]}", daemon=True).start()
+
+    def _dispatch(self, job_id, question_count):
+        executor = self._pool.executor()
+        futures = []
+        # Released by _complete once an item's outcome is committed; wait() would return before the done-callbacks run
+        recorded = threading.Semaphore(0)
+
+        for index, paragraph in self.store.pending_items(job_id):
+            # Bound the number of items queued or running across all jobs
+            self._in_flight.acquire()
+            if self._stop.is_set() or self.store.is_cancelled(job_id):
+                self._in_flight.release()
+                break
+            try:
+                future = executor.submit(run_job_item, paragraph, question_count)
+            except Exception as e:
+                self._in_flight.release()
+                self.store.record(job_id, index, error=str(e))
+                continue
+            future.add_done_callback(partial(self._complete, job_id, index, recorded))
+            futures.append(future)
+
+        for _ in futures:
+            recorded.acquire()
+        # A stopping dispatcher leaves the job running so the next one resumes its unfinished items
+        if self._stop.is_set():
+            return
+        status, completed, failed = self.store.finish(job_id)
+        logger.info(f"Job {job_id} {status}: {completed} completed, {failed} failed")
+
+    def _complete(self, job_id, index, recorded, future):
+        try:
+            # A cancelled item belongs to a stopping dispatcher and is retried when the job resumes
+            if not future.cancelled():
+                try:
+                    self.store.record(job_id, index, quiz=future.result())
+                except Exception as e:
+                    logger.error(f"Job {job_id} item {index} failed: {str(e)}")
+                    self.store.record(job_id, index, error=str(e))
+        finally:
+            self._in_flight.release()
+            recorded.release()
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+
+def run_job_dispatcher(path, **options):
+    """Entry point of a dedicated dispatcher process; runs until SIGTERM"""
+    logging.basicConfig(level=logging.INFO)
+    dispatcher = JobDispatcher(JobStore(path), **options)
+    signal.signal(signal.SIGTERM, lambda *_: dispatcher.stop())
+    try:
+        dispatcher.run()
+    finally:
+        dispatcher.stop()
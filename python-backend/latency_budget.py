@@ -0,0 +1,124 @@
+import threading
+import time
+
+# Decoding strategies from highest to lowest quality
+STRATEGY_ORDER = ('full', 'small_beam', 'greedy')
+
+# Highest quality strategy each tier may use
+QUALITY_TIERS = {
+    'best': 'full',
+    'balanced': 'small_beam',
+    'fast': 'greedy'
+}
+
+# Deterministic stand-ins for strategies that sample, used by requests that ask for reproducible output
+DETERMINISTIC_STRATEGIES = {
+    'full': 'full_beam'
+}
+
+# Latency assumed before any batch has been measured (seconds per output token, CPU t5-base)
+PRIOR_SECONDS_PER_TOKEN = {
+    'full': 0.02,
+    'full_beam': 0.02,
+    'small_beam': 0.01,
+    'greedy': 0.005
+}
+PRIOR_TOKENS_PER_QUESTION = 24
+
+
+class DecodingLatencyTracker:
+    """Moving averages of measured per-token generation latency for each decoding strategy"""
+
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+        self._seconds_per_token = dict(PRIOR_SECONDS_PER_TOKEN)
+        self._tokens_per_question = {strategy: PRIOR_TOKENS_PER_QUESTION for strategy in PRIOR_SECONDS_PER_TOKEN}
+        self._lock = threading.Lock()
+
+    def record(self, strategy, elapsed, questions, tokens_per_question):
+        """Fold one batch of `questions` generations taking `elapsed` seconds into the averages"""
+        if questions <= 0 or tokens_per_question <= 0:
+            return
+        seconds_per_token = elapsed / (questions * tokens_per_question)
+        with self._lock:
+            alpha = self.smoothing
+            self._seconds_per_token[strategy] = (1 - alpha) * self._seconds_per_token[strategy] + alpha * seconds_per_token
+            self._tokens_per_question[strategy] = (1 - alpha) * self._tokens_per_question[strategy] + alpha * tokens_per_question
+
+    def seconds_per_question(self, strategy):
+        with self._lock:
+            return self._seconds_per_token[strategy] * self._tokens_per_question[strategy]
+
+    def stats(self):
+        with self._lock:
+            return {
+                strategy: {
+                    "secondsPerToken": self._seconds_per_token[strategy],
+                    "tokensPerSecond": 1 / self._seconds_per_token[strategy] if self._seconds_per_token[strategy] else 0,
+                    "tokensPerQuestion": self._tokens_per_question[strategy]
+                }
+                for strategy in PRIOR_SECONDS_PER_TOKEN
+            }
+
+
+class GenerationBudget:
+    """Per-request latency budget that picks a decoding strategy and counts how each question was produced"""
+
+    def __init__(self, tracker, deadline_ms=None, quality_tier=None, safety_factor=0.8, deterministic=False):
+        self.tracker = tracker
+        self.deterministic = deterministic
+        self.deadline_ms = deadline_ms
+        self.quality_tier = quality_tier or 'best'
+        self.safety_factor = safety_factor
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_ms / 1000.0 if deadline_ms else None
+        self.strategy = QUALITY_TIERS[self.quality_tier]
+        self.model_generated = 0
+        self.template_generated = 0
+
+    def remaining(self):
+        """Seconds left before the deadline, or None when the request has no deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def plan(self, question_count):
+        """Choose a decoding strategy and how many of question_count questions to send to the model"""
+        strategy, count = self._plan(question_count)
+        if self.deterministic:
+            self.strategy = strategy = DETERMINISTIC_STRATEGIES.get(strategy, strategy)
+        return strategy, count
+
+    def _plan(self, question_count):
+        allowed_strategies = STRATEGY_ORDER[STRATEGY_ORDER.index(QUALITY_TIERS[self.quality_tier]):]
+        remaining = self.remaining()
+        if remaining is None or question_count == 0:
+            self.strategy = allowed_strategies[0]
+            return self.strategy, question_count
+
+        usable = remaining * self.safety_factor
+        for strategy in allowed_strategies:
+            if self.tracker.seconds_per_question(strategy) * question_count <= usable:
+                self.strategy = strategy
+                return strategy, question_count
+
+        # Even the cheapest strategy cannot cover every question: generate what fits, templates fill the rest
+        self.strategy = allowed_strategies[-1]
+        affordable = int(usable / self.tracker.seconds_per_question(self.strategy))
+        return self.strategy, max(0, min(question_count, affordable))
+
+    def record(self, from_model):
+        if from_model:
+            self.model_generated += 1
+        else:
+            self.template_generated += 1
+
+    def to_metadata(self):
+        return {
+            "modelGenerated": self.model_generated,
+            "templateGenerated": self.template_generated,
+            "decodingStrategy": self.strategy,
+            "qualityTier": self.quality_tier,
+            "deadlineMs": self.deadline_ms,
+            "elapsedMs": round((time.monotonic() - self.started) * 1000, 1)
+        }
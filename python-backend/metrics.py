@@ -0,0 +1,150 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; spans a cached lookup up to a full-quiz beam search on CPU
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request stage breakdown, only collected when the request asked for it
+_request_timings = ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe is a bisect and two additions"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process counters, histograms and scrape-time gauges rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, name, metric_type, help_text, **extra):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = dict(type=metric_type, help=help_text, values={}, **extra)
+
+    def counter(self, name, help_text):
+        self._register(name, 'counter', help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._register(name, 'histogram', help_text, buckets=tuple(buckets))
+
+    def gauge(self, name, help_text, collect=None, metric_type='gauge'):
+        """Gauge moved with inc, or read when scraped if `collect` returns a number or a {labels: number} dict"""
+        self._register(name, metric_type, help_text, collect=collect)
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        metric = self._metrics[name]
+        with self._lock:
+            metric['values'][key] = metric['values'].get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        metric = self._metrics[name]
+        with self._lock:
+            histogram = metric['values'].get(key)
+            if histogram is None:
+                histogram = metric['values'][key] = Histogram(metric['buckets'])
+            histogram.observe(value)
+
+    def histogram_totals(self, name):
+        """{labels: (sum, count)} of every series of a histogram"""
+        with self._lock:
+            return {labels: (histogram.sum, histogram.count) for labels, histogram in self._metrics[name]['values'].items()}
+
+    @contextmanager
+    def stage(self, stage, histogram='quiz_stage_seconds'):
+        """Time a block into the stage histogram and into the current request's breakdown"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(histogram, elapsed, stage=stage)
+            record_request_timing(stage, elapsed)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = [(name, dict(metric, values=dict(metric['values']))) for name, metric in self._metrics.items()]
+
+        for name, metric in metrics:
+            values = metric['values']
+            if metric.get('collect'):
+                try:
+                    collected = metric['collect']()
+                except Exception:
+                    continue
+                if collected is None:
+                    continue
+                values = collected if isinstance(collected, dict) else {(): collected}
+
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for labels, value in values.items():
+                if metric['type'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                with self._lock:
+                    counts, total, count = list(value.counts), value.sum, value.count
+                cumulative = 0
+                for bound, bucket_count in zip(metric['buckets'] + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (('le', _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def begin_request_timings(enabled):
+    """Start (or switch off) the stage breakdown for the request handled by this thread"""
+    _request_timings.set({} if enabled else None)
+
+
+def record_request_timing(stage, seconds):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def request_timings():
+    """Stage breakdown of the current request in milliseconds, or None when it was not requested"""
+    timings = _request_timings.get()
+    if timings is None:
+        return None
+    return {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
@@ -0,0 +1,138 @@
+import logging
+import math
+import threading
+from collections import namedtuple
+
+from process_pool import LazyProcessPool
+
+logger = logging.getLogger(__name__)
+
+NLP_BACKENDS = ('nltk', 'spacy')
+
+# Only tokens, sentence boundaries and fine-grained Penn Treebank tags are read, so nothing else runs
+SPACY_EXCLUDED_COMPONENTS = ('parser', 'ner', 'lemmatizer', 'attribute_ruler', 'textcat')
+
+# What every backend produces for a text; TextAnalysis derives entities and noun phrases from it
+TaggedText = namedtuple('TaggedText', ['sentences', 'tokens', 'pos_tags'])
+
+
+class NltkBackend:
+    """Punkt sentences, Treebank tokens and the averaged perceptron tagger, loaded once per process"""
+
+    name = 'nltk'
+
+    def __init__(self, data_dir=None):
+        import nltk
+        if data_dir and data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+        self._tagger = None
+        self._lock = threading.Lock()
+
+    def _get_tagger(self):
+        # nltk.pos_tag unpickles the perceptron model on every call; one instance is reused instead
+        with self._lock:
+            if self._tagger is None:
+                from nltk.tag.perceptron import PerceptronTagger
+                self._tagger = PerceptronTagger()
+            return self._tagger
+
+    def tag(self, texts, batch_size=None):
+        from nltk.tokenize import sent_tokenize, word_tokenize
+        tagger = self._get_tagger()
+        for text in texts:
+            # word_tokenize(text) is Punkt followed by Treebank per sentence, so reuse the sentences
+            sentences = sent_tokenize(text)
+            tokens = [token for sentence in sentences for token in word_tokenize(sentence, preserve_line=True)]
+            yield TaggedText(tuple(sentences), tuple(tokens), tuple(tagger.tag(tokens)))
+
+    def tag_one(self, text):
+        return next(self.tag([text]))
+
+
+class SpacyBackend:
+    """spaCy pipeline reduced to the tokenizer, tagger and sentence recognizer, run through nlp.pipe"""
+
+    name = 'spacy'
+
+    def __init__(self, model='en_core_web_sm'):
+        import spacy
+        self.nlp = spacy.load(model, exclude=list(SPACY_EXCLUDED_COMPONENTS))
+        if 'senter' in self.nlp.disabled:
+            self.nlp.enable_pipe('senter')
+        elif 'senter' not in self.nlp.pipe_names:
+            self.nlp.add_pipe('sentencizer')
+        logger.info(f"Loaded spaCy model {model} with components: {', '.join(self.nlp.pipe_names)}")
+
+    def tag(self, texts, batch_size=64):
+        for doc in self.nlp.pipe(texts, batch_size=batch_size):
+            tokens = [token for token in doc if not token.is_space]
+            sentences = [sentence.text.strip() for sentence in doc.sents if sentence.text.strip()]
+            yield TaggedText(
+                tuple(sentences),
+                tuple(token.text for token in tokens),
+                tuple((token.text, token.tag_) for token in tokens)
+            )
+
+    def tag_one(self, text):
+        return next(self.tag([text]))
+
+
+def create_nlp_backend(name='nltk', **options):
+    """Load an NLP backend by name; options go to its constructor"""
+    if name == 'nltk':
+        return NltkBackend(data_dir=options.get('data_dir'))
+    if name == 'spacy':
+        return SpacyBackend(model=options.get('model', 'en_core_web_sm'))
+    raise ValueError(f"Unknown NLP backend '{name}', expected one of: {', '.join(NLP_BACKENDS)}")
+
+
+def merge_tagged(parts):
+    """One TaggedText for a document tagged in consecutive pieces"""
+    parts = list(parts)
+    return TaggedText(
+        tuple(sentence for part in parts for sentence in part.sentences),
+        tuple(token for part in parts for token in part.tokens),
+        tuple(tag for part in parts for tag in part.pos_tags)
+    )
+
+
+# Backend of the current pool worker process
+_worker_backend = None
+
+
+def init_nlp_worker(name, options):
+    global _worker_backend
+    _worker_backend = create_nlp_backend(name, **options)
+
+
+def tag_chunk(texts, batch_size):
+    return list(_worker_backend.tag(texts, batch_size))
+
+
+class NlpProcessPool:
+    """Worker processes that each load the NLP backend once and tag chunks of texts in parallel"""
+
+    def __init__(self, name, options, processes, batch_size=64, start_method='spawn'):
+        self.name = name
+        self.options = options
+        self.processes = max(1, processes)
+        self.batch_size = max(1, batch_size)
+        # Worker processes are only started once the first large input arrives
+        self._pool = LazyProcessPool(
+            self.processes,
+            initializer=init_nlp_worker,
+            initargs=(name, options),
+            start_method=start_method,
+            name=f"{name} NLP worker"
+        )
+
+    def tag(self, texts):
+        """TaggedText for every text, in order"""
+        texts = list(texts)
+        chunk_size = max(1, min(self.batch_size, math.ceil(len(texts) / self.processes)))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        results = self._pool.executor().map(tag_chunk, chunks, [self.batch_size] * len(chunks))
+        return [tagged for chunk in results for tagged in chunk]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,278 @@
+import logging
+import sqlite3
+
+import numpy as np
+
+from sqlite_connections import ThreadLocalConnections
+
+logger = logging.getLogger(__name__)
+
+# Share of top and bottom scorers compared by the discrimination index (Kelley's 27%)
+DISCRIMINATION_GROUP = 0.27
+
+# Score distribution bands: 0-9%, 10-19%, ..., 90-100%
+SCORE_BUCKETS = 10
+
+
+def _index(values):
+    """Integer codes for `values` plus the list of distinct labels, in order of first appearance"""
+    labels = {}
+    codes = np.fromiter((labels.setdefault(value, len(labels)) for value in values), dtype=np.int64, count=len(values))
+    return codes, list(labels)
+
+
+def _rates(correct, codes, size, weights=None):
+    """Correct and total counts per code, optionally restricted by a 0/1 weight per response"""
+    weights = np.ones(len(codes)) if weights is None else weights
+    totals = np.bincount(codes, weights=weights, minlength=size)
+    corrects = np.bincount(codes, weights=correct * weights, minlength=size)
+    return corrects, totals
+
+
+def _score_buckets(scores):
+    """Number of attempts per SCORE_BUCKETS-wide score band"""
+    bands = np.minimum((scores // (100 / SCORE_BUCKETS)).astype(np.int64), SCORE_BUCKETS - 1)
+    return np.bincount(bands, minlength=SCORE_BUCKETS)
+
+
+def _percentages(corrects, totals):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totals > 0, corrects / np.maximum(totals, 1) * 100, 0.0)
+
+
+class ResponseMatrix:
+    """Every answered question of a batch of attempts, flattened into parallel NumPy arrays"""
+
+    def __init__(self, attempts):
+        attempt_ids, items, topics, difficulties, chosen, expected = [], [], [], [], [], []
+        self.time_spent = np.zeros(len(attempts))
+        self.users = []
+        self.quizzes = []
+        for a, attempt in enumerate(attempts):
+            quiz = attempt.get('quiz', {}) or {}
+            user_answers = attempt.get('userAnswers', {}) or {}
+            quiz_id = str(quiz.get('id', 'quiz'))
+            self.time_spent[a] = attempt.get('timeSpent', 0) or 0
+            self.users.append(attempt.get('userId'))
+            self.quizzes.append(quiz_id)
+            for i, question in enumerate(quiz.get('questions', [])):
+                attempt_ids.append(a)
+                items.append((quiz_id, str(question.get('id', i))))
+                topics.append(question.get('topic', 'General'))
+                difficulties.append(question.get('difficulty', 'medium'))
+                # Same defaults as the single-attempt endpoint
+                chosen.append(user_answers.get(str(i), -1))
+                expected.append(question.get('correctAnswer', -1))
+
+        self.attempt_count = len(attempts)
+        self.attempt = np.asarray(attempt_ids, dtype=np.int64)
+        self.item, self.item_labels = _index(items)
+        self.topic, self.topic_labels = _index(topics)
+        self.difficulty, self.difficulty_labels = _index(difficulties)
+        self.quiz, self.quiz_labels = _index(self.quizzes)
+        self.correct = np.fromiter((c == e for c, e in zip(chosen, expected)), dtype=np.float64, count=len(chosen))
+
+    def attempt_scores(self):
+        """Correct answers, question counts and percentage score of every attempt"""
+        corrects, totals = _rates(self.correct, self.attempt, self.attempt_count)
+        return corrects, totals, _percentages(corrects, totals)
+
+    def breakdown(self, codes, labels, per_attempt=False):
+        """Correct and total counts per label, over the whole batch or as (attempts x labels) matrices"""
+        if not per_attempt:
+            corrects, totals = _rates(self.correct, codes, len(labels))
+            return corrects, totals
+        combined = self.attempt * len(labels) + codes
+        corrects, totals = _rates(self.correct, combined, self.attempt_count * len(labels))
+        shape = (self.attempt_count, len(labels))
+        return corrects.reshape(shape), totals.reshape(shape)
+
+    def item_statistics(self, scores):
+        """Per-question p-value (share correct) and upper-minus-lower discrimination index"""
+        item_count = len(self.item_labels)
+        corrects, totals = _rates(self.correct, self.item, item_count)
+
+        # Upper and lower groups are ranked within each quiz, since scores of different quizzes don't compare
+        upper = np.zeros(self.attempt_count)
+        lower = np.zeros(self.attempt_count)
+        for q in range(len(self.quiz_labels)):
+            members = np.flatnonzero(self.quiz == q)
+            if len(members) < 2:
+                continue
+            group = max(1, int(round(len(members) * DISCRIMINATION_GROUP)))
+            ranked = members[np.argsort(scores[members], kind='stable')]
+            lower[ranked[:group]] = 1
+            upper[ranked[-group:]] = 1
+
+        upper_correct, upper_total = _rates(self.correct, self.item, item_count, upper[self.attempt])
+        lower_correct, lower_total = _rates(self.correct, self.item, item_count, lower[self.attempt])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p_values = np.where(totals > 0, corrects / np.maximum(totals, 1), 0.0)
+            discrimination = np.where(
+                (upper_total > 0) & (lower_total > 0),
+                upper_correct / np.maximum(upper_total, 1) - lower_correct / np.maximum(lower_total, 1),
+                np.nan
+            )
+        return [
+            {
+                "quizId": quiz_id,
+                "questionId": question_id,
+                "responses": int(totals[i]),
+                "pValue": float(p_values[i]),
+                "discrimination": None if np.isnan(discrimination[i]) else float(discrimination[i])
+            }
+            for i, (quiz_id, question_id) in enumerate(self.item_labels)
+        ]
+
+
+def analyze_attempts(attempts, include_attempts=True):
+    """Cohort report for a batch of attempts, computed in vectorized passes over all responses"""
+    matrix = ResponseMatrix(attempts)
+    corrects, totals, scores = matrix.attempt_scores()
+    topic_correct, topic_total = matrix.breakdown(matrix.topic, matrix.topic_labels)
+    difficulty_correct, difficulty_total = matrix.breakdown(matrix.difficulty, matrix.difficulty_labels)
+
+    report = {
+        "attempts": matrix.attempt_count,
+        "responses": int(len(matrix.correct)),
+        "overall": {
+            "mean_score": float(scores.mean()) if matrix.attempt_count else 0.0,
+            "median_score": float(np.median(scores)) if matrix.attempt_count else 0.0,
+            "std_score": float(scores.std()) if matrix.attempt_count else 0.0,
+            "score_distribution": _score_buckets(scores).tolist()
+        },
+        "topic_breakdown": dict(zip(matrix.topic_labels, _percentages(topic_correct, topic_total).tolist())),
+        "difficulty_breakdown": dict(zip(matrix.difficulty_labels, _percentages(difficulty_correct, difficulty_total).tolist())),
+        "items": matrix.item_statistics(scores)
+    }
+
+    if include_attempts:
+        attempt_topic_correct, attempt_topic_total = matrix.breakdown(matrix.topic, matrix.topic_labels, per_attempt=True)
+        attempt_topics = _percentages(attempt_topic_correct, attempt_topic_total)
+        attempt_difficulty_correct, attempt_difficulty_total = matrix.breakdown(
+            matrix.difficulty, matrix.difficulty_labels, per_attempt=True
+        )
+        attempt_difficulties = _percentages(attempt_difficulty_correct, attempt_difficulty_total)
+        efficient = matrix.time_spent <= totals * 90
+        report["attemptResults"] = [
+            {
+                "userId": matrix.users[a],
+                "overall_score": float(scores[a]),
+                "correct_answers": int(corrects[a]),
+                "total_questions": int(totals[a]),
+                "time_efficiency": "good" if efficient[a] else "needs_improvement",
+                "topic_breakdown": {
+                    label: float(attempt_topics[a, t]) for t, label in enumerate(matrix.topic_labels) if attempt_topic_total[a, t]
+                },
+                "difficulty_breakdown": {
+                    label: float(attempt_difficulties[a, d]) for d, label in enumerate(matrix.difficulty_labels) if attempt_difficulty_total[a, d]
+                }
+            }
+            for a in range(matrix.attempt_count)
+        ]
+
+    return report, matrix
+
+
+class PerformanceAggregateStore:
+    """Running per-cohort and per-user counters in SQLite, updated per batch instead of rescanning history"""
+
+    def __init__(self, path=None):
+        self._open(path)
+        if path and self.path is None:
+            self._open(None)
+
+    def _open(self, path):
+        # Without a path the store lives in a process-wide shared in-memory database
+        self.path = path or 'file:performance_aggregates?mode=memory&cache=shared'
+        self._connections = ThreadLocalConnections(self.path, uri=not path, wal=bool(path), check_same_thread=False)
+        try:
+            # Keeps a shared in-memory database alive while the store exists
+            self._anchor = self._connection()
+            self._anchor.execute(
+                "CREATE TABLE IF NOT EXISTS aggregates ("
+                "cohort TEXT NOT NULL, dimension TEXT NOT NULL, key TEXT NOT NULL, "
+                "correct REAL NOT NULL, total REAL NOT NULL, PRIMARY KEY (cohort, dimension, key))"
+            )
+            self._anchor.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Keeping performance aggregates in memory instead of {path}: {str(e)}")
+            self.path = None
+
+    def _connection(self):
+        return self._connections.get()
+
+    def add(self, cohort, matrix):
+        """Fold the responses of one analyzed batch into the cohort's running counters"""
+        corrects, totals, scores = matrix.attempt_scores()
+        rows = [(cohort, 'overall', 'attempts', float(corrects.sum()), float(totals.sum()))]
+        rows.append((cohort, 'overall', 'score_sum', float(scores.sum()), float(matrix.attempt_count)))
+
+        for dimension, codes, labels in (
+            ('topic', matrix.topic, matrix.topic_labels),
+            ('difficulty', matrix.difficulty, matrix.difficulty_labels),
+            ('item', matrix.item, ['/'.join(label) for label in matrix.item_labels])
+        ):
+            label_correct, label_total = _rates(matrix.correct, codes, len(labels))
+            rows.extend((cohort, dimension, str(label), float(c), float(t)) for label, c, t in zip(labels, label_correct, label_total))
+
+        rows.extend(
+            (cohort, 'score_bucket', str(b), 0.0, float(count)) for b, count in enumerate(_score_buckets(scores)) if count
+        )
+
+        users = {}
+        for a, user in enumerate(matrix.users):
+            if user is not None:
+                user_correct, user_total = users.get(str(user), (0.0, 0.0))
+                users[str(user)] = (user_correct + corrects[a], user_total + totals[a])
+        rows.extend((cohort, 'user', user, float(c), float(t)) for user, (c, t) in users.items())
+
+        connection = self._connection()
+        connection.executemany(
+            "INSERT INTO aggregates (cohort, dimension, key, correct, total) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (cohort, dimension, key) DO UPDATE SET "
+            "correct = correct + excluded.correct, total = total + excluded.total",
+            rows
+        )
+        connection.commit()
+
+    def summary(self, cohort, user=None):
+        """Dashboard view of a cohort (or one of its users) from the stored counters, or None if unknown"""
+        connection = self._connection()
+        if user is not None:
+            row = connection.execute(
+                "SELECT correct, total FROM aggregates WHERE cohort = ? AND dimension = 'user' AND key = ?",
+                (cohort, str(user))
+            ).fetchone()
+            if row is None:
+                return None
+            return {"cohort": cohort, "userId": user, "correct_answers": int(row[0]),
+                    "total_questions": int(row[1]), "overall_score": row[0] / row[1] * 100 if row[1] else 0.0}
+
+        rows = connection.execute(
+            "SELECT dimension, key, correct, total FROM aggregates WHERE cohort = ?", (cohort,)
+        ).fetchall()
+        if not rows:
+            return None
+        grouped = {}
+        for dimension, key, correct, total in rows:
+            grouped.setdefault(dimension, {})[key] = (correct, total)
+
+        responses_correct, responses = grouped['overall'].get('attempts', (0.0, 0.0))
+        score_sum, attempts = grouped['overall'].get('score_sum', (0.0, 0.0))
+
+        def percentages(dimension):
+            return {key: correct / total * 100 if total else 0.0 for key, (correct, total) in grouped.get(dimension, {}).items()}
+
+        return {
+            "cohort": cohort,
+            "attempts": int(attempts),
+            "responses": int(responses),
+            "mean_score": score_sum / attempts if attempts else 0.0,
+            "response_accuracy": responses_correct / responses * 100 if responses else 0.0,
+            "score_distribution": [int(grouped.get('score_bucket', {}).get(str(b), (0, 0))[1]) for b in range(SCORE_BUCKETS)],
+            "topic_breakdown": percentages('topic'),
+            "difficulty_breakdown": percentages('difficulty'),
+            "item_p_values": {key: correct / total if total else 0.0 for key, (correct, total) in grouped.get('item', {}).items()},
+            "users": len(grouped.get('user', {}))
+        }
@@ -0,0 +1,50 @@
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_for_fork(model):
+    """Freeze a loaded model for inference and keep the GC from dirtying shared pages after fork"""
+    model.eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+
+    # Objects alive now are moved to a permanent generation the collector never writes to,
+    # so forked workers keep sharing their pages copy-on-write
+    gc.collect()
+    gc.freeze()
+
+
+def configure_worker_threads(workers, threads=None):
+    """Split the machine's cores between worker processes so their torch thread pools don't oversubscribe"""
+    import torch
+
+    intra_op = threads or max(1, (os.cpu_count() or 1) // max(1, workers))
+    torch.set_num_threads(intra_op)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only possible before the first inter-op parallel work of the process
+        pass
+    logger.info(f"Worker {os.getpid()} using {intra_op} intra-op torch threads")
+    return intra_op
+
+
+def memory_usage(pid='self'):
+    """Resident (RSS), proportional (PSS) and unique (USS) memory of a process in MB"""
+    usage = {"rss": 0.0, "pss": 0.0, "uss": 0.0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            for line in smaps:
+                field, _, value = line.partition(':')
+                if field == 'Rss':
+                    usage["rss"] = int(value.split()[0]) / 1024
+                elif field == 'Pss':
+                    usage["pss"] = int(value.split()[0]) / 1024
+                elif field in ('Private_Clean', 'Private_Dirty'):
+                    usage["uss"] += int(value.split()[0]) / 1024
+    except OSError:
+        logger.warning("smaps_rollup is not available, memory usage is only reported on Linux")
+    return usage
@@ -0,0 +1,38 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class LazyProcessPool:
+    """ProcessPoolExecutor whose worker processes are only started when the first task arrives"""
+
+    def __init__(self, processes, initializer=None, initargs=(), start_method='spawn', name='worker'):
+        self.processes = max(1, processes)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.start_method = start_method
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=self.initializer,
+                    initargs=self.initargs
+                )
+                logger.info(f"Started {self.name} pool with {self.processes} processes")
+            return self._executor
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes, dropping tasks that have not started; the pool restarts on next use"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,117 @@
+import re
+from collections import Counter, deque
+
+SHINGLE_PATTERN = re.compile(r'\w+')
+
+
+def rank_noun_phrases(analysis):
+    """Noun phrases by how often the whole phrase occurs, then by how frequent its words are"""
+    phrase_words = {phrase: tuple(phrase.lower().split()) for phrase in analysis.noun_phrases}
+    wanted = set(phrase_words.values())
+
+    # One pass over the tokens per distinct phrase length counts every phrase occurrence
+    tokens = [token.lower() for token in analysis.tokens]
+    occurrences = Counter()
+    for length in {len(words) for words in wanted}:
+        for i in range(len(tokens) - length + 1):
+            ngram = tuple(tokens[i:i + length])
+            if ngram in wanted:
+                occurrences[ngram] += 1
+
+    frequencies = {word.lower(): count for word, count in analysis.entity_frequencies.items()}
+
+    def phrase_salience(phrase):
+        words = phrase_words[phrase]
+        return occurrences[words], sum(frequencies.get(word, 0) for word in words)
+
+    return tuple(sorted(analysis.noun_phrases, key=phrase_salience, reverse=True))
+
+
+class AnswerPlanner:
+    """Hands out distinct answers ranked by salience and counts the model calls a quiz needed"""
+
+    def __init__(self, analysis):
+        # The ranking only depends on the text, so it is kept on the cached analysis
+        if analysis.ranked_noun_phrases is None:
+            analysis.ranked_noun_phrases = rank_noun_phrases(analysis)
+
+        # key_entities are already ordered by frequency
+        self._queues = {
+            'entity': deque(analysis.key_entities),
+            'phrase': deque(analysis.ranked_noun_phrases)
+        }
+        self._sentences = deque(analysis.sentences)
+        self._used = []
+        self._used_lower = set()
+        self.repeated_answers = 0
+        self.model_slots = 0
+        self.model_calls = 0
+        self.regenerated = 0
+
+    def take(self, kind, allow_repeat=True):
+        """Most salient unused answer of `kind`, then of the other kind, then a repeat of an earlier answer"""
+        for queue_kind in (kind, 'phrase' if kind == 'entity' else 'entity'):
+            queue = self._queues[queue_kind]
+            while queue:
+                answer = queue.popleft()
+                if answer.lower() not in self._used_lower:
+                    self._used.append(answer)
+                    self._used_lower.add(answer.lower())
+                    return answer
+        if not allow_repeat or not self._used:
+            return None
+
+        # Every candidate is taken: cycle through them in the order they were handed out
+        answer = self._used[self.repeated_answers % len(self._used)]
+        self.repeated_answers += 1
+        return answer
+
+    def take_sentence(self):
+        """Next sentence for inference questions, cycling so short passages still fill every slot"""
+        if not self._sentences:
+            return None
+        sentence = self._sentences.popleft()
+        self._sentences.append(sentence)
+        return sentence
+
+    def record_generation(self, slots, calls):
+        """Count `slots` model-backed questions that were served by `calls` generations"""
+        self.model_slots += slots
+        self.model_calls += calls
+
+    def to_metadata(self):
+        return {
+            "uniqueAnswers": len(self._used),
+            "repeatedAnswers": self.repeated_answers,
+            "modelCalls": self.model_calls,
+            "regenerated": self.regenerated,
+            # One generation per model-backed question is what drawing answers at random cost
+            "callsSaved": self.model_slots - self.model_calls
+        }
+
+
+def shingles(text, size=3):
+    """Set of overlapping lowercase word n-grams of a question"""
+    words = SHINGLE_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class NearDuplicateFilter:
+    """Rejects questions whose word shingles overlap an accepted question beyond a Jaccard threshold"""
+
+    def __init__(self, threshold=0.6, size=3):
+        self.threshold = threshold
+        self.size = size
+        self._accepted = []
+
+    def is_duplicate(self, question):
+        candidate = shingles(question, self.size)
+        for accepted in self._accepted:
+            if len(candidate & accepted) / len(candidate | accepted) >= self.threshold:
+                return True
+        return False
+
+    def add(self, question):
+        self._accepted.append(shingles(question, self.size))
@@ -0,0 +1,216 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from sqlite_connections import ThreadLocalConnections
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# Corpus paragraphs analyzed per NLP backend batch during a build
+ANALYSIS_BATCH_SIZE = 64
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS questions ("
+    "id INTEGER PRIMARY KEY, source_key TEXT NOT NULL, kind TEXT NOT NULL, topic TEXT NOT NULL, "
+    "passage_hash TEXT, difficulty TEXT NOT NULL, question TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS questions_by_source ON questions (source_key)",
+    "CREATE INDEX IF NOT EXISTS questions_by_passage ON questions (kind, passage_hash)",
+    "CREATE INDEX IF NOT EXISTS questions_by_topic ON questions (kind, topic, difficulty)",
+    # Topic lookups for keywords go through FTS so case, punctuation and word order variants still hit
+    "CREATE VIRTUAL TABLE IF NOT EXISTS topics_fts USING fts5 (topic, content='questions', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN "
+    "INSERT INTO topics_fts (rowid, topic) VALUES (new.id, new.topic); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN "
+    "INSERT INTO topics_fts (topics_fts, rowid, topic) VALUES ('delete', old.id, old.topic); END",
+    "CREATE TABLE IF NOT EXISTS sources ("
+    "source_key TEXT PRIMARY KEY, kind TEXT NOT NULL, topic TEXT NOT NULL, metadata TEXT NOT NULL, built_at REAL NOT NULL)"
+)
+
+
+def normalize_topic(topic):
+    return ' '.join(re.findall(r'\w+', topic.lower()))
+
+
+def normalize_question(question):
+    return ' '.join(question.get("question", "").lower().split())
+
+
+def unique_questions(questions):
+    """Questions in order, keeping only the first of any that share the same normalized text"""
+    seen = set()
+    unique = []
+    for question in questions:
+        key = normalize_question(question)
+        if key not in seen:
+            seen.add(key)
+            unique.append(question)
+    return unique
+
+
+class QuizBank:
+    """Pregenerated questions in SQLite, indexed by passage hash and by topic and difficulty"""
+
+    def __init__(self, path):
+        self.path = path
+        # Serve reads from a memory mapping of the file instead of copying pages into the SQLite cache
+        self._connections = ThreadLocalConnections(path, pragmas=("mmap_size=268435456",))
+        connection = self._connection()
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+
+    def _connection(self):
+        return self._connections.get()
+
+    def has_source(self, source_key):
+        return self._connection().execute(
+            "SELECT 1 FROM sources WHERE source_key = ?", (source_key,)
+        ).fetchone() is not None
+
+    def add(self, source_key, kind, topic, questions, metadata=None, passage_hash=None):
+        """Replace the questions built from one passage or keyword/difficulty pair"""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM questions WHERE source_key = ?", (source_key,))
+            connection.executemany(
+                "INSERT INTO questions (source_key, kind, topic, passage_hash, difficulty, question) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (source_key, kind, normalize_topic(topic), passage_hash, question.get("difficulty", "medium"), json.dumps(question))
+                    for question in unique_questions(questions)
+                ]
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO sources (source_key, kind, topic, metadata, built_at) VALUES (?, ?, ?, ?, ?)",
+                (source_key, kind, topic, json.dumps(metadata or {}), time.time())
+            )
+
+    def sample_passage(self, passage_hash, count, rng=None):
+        """`count` random distinct questions built from a passage plus its stored metadata, or None on a miss
+
+        Rows are sampled in id order, so a seeded `rng` picks the same questions every time.
+        """
+        connection = self._connection()
+        rows = connection.execute(
+            "SELECT question FROM questions WHERE kind = 'paragraph' AND passage_hash = ? ORDER BY id", (passage_hash,)
+        ).fetchall()
+        questions = self._sample(rows, count, rng)
+        if questions is None:
+            return None
+        source = connection.execute("SELECT metadata FROM sources WHERE source_key = ?", (passage_hash,)).fetchone()
+        return questions, json.loads(source[0]) if source else {}
+
+    def sample_keyword(self, keyword, difficulty, count, rng=None):
+        """`count` random distinct questions for a keyword at one difficulty, or None on a miss"""
+        topic = normalize_topic(keyword)
+        if not topic:
+            return None
+        connection = self._connection()
+        rows = connection.execute(
+            "SELECT question FROM questions WHERE kind = 'keyword' AND topic = ? AND difficulty = ? ORDER BY id", (topic, difficulty)
+        ).fetchall()
+        if not rows:
+            # Same words in another order, e.g. "learning machine" for "machine learning"
+            words = set(topic.split())
+            candidates = connection.execute(
+                "SELECT q.topic, q.question FROM topics_fts JOIN questions q ON q.id = topics_fts.rowid "
+                "WHERE topics_fts MATCH ? AND q.kind = 'keyword' AND q.difficulty = ? ORDER BY q.id",
+                (' '.join(f'"{word}"' for word in words), difficulty)
+            ).fetchall()
+            rows = [(question,) for candidate, question in candidates if set(candidate.split()) == words]
+        return self._sample(rows, count, rng)
+
+    @staticmethod
+    def _sample(rows, count, rng):
+        # Banks built before add() deduplicated, and keyword topics merged by FTS, can repeat a question
+        questions = unique_questions(json.loads(row[0]) for row in rows)
+        if len(questions) < count:
+            return None
+        return (rng or random).sample(questions, count)
+
+    def stats(self):
+        connection = self._connection()
+        counts = dict(connection.execute("SELECT kind, COUNT(*) FROM questions GROUP BY kind").fetchall())
+        sources = connection.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        return {"paragraphQuestions": counts.get('paragraph', 0), "keywordQuestions": counts.get('keyword', 0), "sources": sources}
+
+
+def read_corpus(path):
+    """Corpus entries from a JSONL file of {"paragraph": ...} or {"keyword": ..., "difficulty": ...} lines"""
+    with open(path, encoding='utf-8') as corpus:
+        for line_number, line in enumerate(corpus, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping line {line_number} of {path}: not valid JSON")
+
+
+def build_quiz_bank(corpus_path, output_path, questions_per_passage=20, questions_per_keyword=10, rebuild=False):
+    """Run the live generators over a corpus and store their questions, skipping entries already built"""
+    import app as backend
+    from text_analysis import content_hash
+
+    bank = QuizBank(output_path)
+    entries = list(read_corpus(corpus_path))
+    if any(entry.get('paragraph') for entry in entries):
+        backend.load_models()
+
+    built = skipped = 0
+    paragraphs = {}
+    for entry in entries:
+        if entry.get('paragraph'):
+            paragraph = entry['paragraph'].strip()
+            passage_hash = content_hash(paragraph)
+            if passage_hash in paragraphs or (not rebuild and bank.has_source(passage_hash)):
+                skipped += 1
+                continue
+            paragraphs[passage_hash] = (paragraph, entry.get('topic'))
+        elif entry.get('keyword'):
+            keyword = entry['keyword'].strip()
+            for difficulty in ([entry['difficulty']] if entry.get('difficulty') else KEYWORD_DIFFICULTIES):
+                source_key = f"keyword:{normalize_topic(keyword)}:{difficulty}"
+                if not rebuild and bank.has_source(source_key):
+                    skipped += 1
+                    continue
+                questions = backend.generate_keyword_questions(keyword, questions_per_keyword, difficulty)
+                bank.add(source_key, 'keyword', keyword, questions)
+                built += 1
+
+    # Paragraphs are tagged a batch at a time by the NLP backend before generating their questions
+    pending = list(paragraphs.items())
+    for start in range(0, len(pending), ANALYSIS_BATCH_SIZE):
+        batch = pending[start:start + ANALYSIS_BATCH_SIZE]
+        analyses = backend.analyze_texts([paragraph for _, (paragraph, _) in batch])
+        for (passage_hash, (paragraph, topic)), analysis in zip(batch, analyses):
+            key_entities, noun_phrases = backend.extract_key_entities(paragraph, analysis)
+            questions = backend.create_comprehensive_questions(
+                paragraph, key_entities, noun_phrases, questions_per_passage, analysis
+            )
+            topic = topic or (noun_phrases[0] if noun_phrases else (key_entities[0] if key_entities else "Text Analysis"))
+            bank.add(passage_hash, 'paragraph', topic, questions,
+                     {"keyEntities": key_entities, "nounPhrases": noun_phrases}, passage_hash=passage_hash)
+            built += 1
+
+    logger.info(f"Quiz bank {output_path}: built {built} entries, skipped {skipped} already present")
+    return {"built": built, "skipped": skipped, **bank.stats()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pregenerate quiz questions for a corpus of passages and keywords")
+    parser.add_argument('--corpus', required=True, help="JSONL file of {\"paragraph\": ...} or {\"keyword\": ...} entries")
+    parser.add_argument('--output', default=os.environ.get('QUIZ_BANK_PATH') or 'quiz_bank.sqlite3')
+    parser.add_argument('--questions-per-passage', type=int, default=20)
+    parser.add_argument('--questions-per-keyword', type=int, default=10)
+    parser.add_argument('--rebuild', action='store_true', help="regenerate entries that are already in the bank")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    os.environ['T5_LOAD_ON_IMPORT'] = '0'
+    print(json.dumps(build_quiz_bank(
+        args.corpus, args.output, args.questions_per_passage, args.questions_per_keyword, args.rebuild
+    ), indent=2))
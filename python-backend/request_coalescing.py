@@ -0,0 +1,100 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+# How a coalesced request was answered
+CACHE_HIT = 'hit'
+COALESCED = 'coalesced'
+COMPUTED = 'computed'
+
+
+def normalize_paragraph(paragraph):
+    """Paragraph with line endings, runs of spaces and surrounding whitespace normalized; blank lines are kept"""
+    lines = [' '.join(line.split()) for line in paragraph.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def request_key(paragraph, **options):
+    """Stable key of a quiz request from its normalized paragraph and generation options"""
+    payload = json.dumps({"paragraph": normalize_paragraph(paragraph), **options}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RequestCoalescer:
+    """Singleflight over identical requests plus a short-TTL, bounded cache of their finished responses"""
+
+    def __init__(self, ttl_seconds=30.0, max_entries=256, wait_timeout=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._in_flight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.computed = 0
+
+    def run(self, key, compute, use_cache=True, follow=None):
+        """Return (response, outcome): a cached response, the result of an identical in-flight call, or compute()
+
+        A follower holds the context manager returned by `follow()` while it waits, which may refuse it by
+        raising, and gives up with concurrent.futures.TimeoutError after `wait_timeout` seconds.
+        """
+        with self._lock:
+            if use_cache:
+                entry = self._responses.get(key)
+                if entry is not None:
+                    expires, response = entry
+                    if expires > time.monotonic():
+                        self._responses.move_to_end(key)
+                        self.hits += 1
+                        return response, CACHE_HIT
+                    del self._responses[key]
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.computed += 1
+
+        # Followers wait for the leader; its exception is raised in every waiting request
+        if not leader:
+            with follow() if follow is not None else nullcontext():
+                response = future.result(timeout=self.wait_timeout)
+            with self._lock:
+                self.coalesced += 1
+            return response, COALESCED
+
+        try:
+            response = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            if self.ttl_seconds > 0 and self.max_entries > 0:
+                self._responses[key] = (time.monotonic() + self.ttl_seconds, response)
+                self._responses.move_to_end(key)
+                while len(self._responses) > self.max_entries:
+                    self._responses.popitem(last=False)
+        future.set_result(response)
+        return response, COMPUTED
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "computed": self.computed,
+                "inFlight": len(self._in_flight),
+                "cachedResponses": len(self._responses),
+                "ttlSeconds": self.ttl_seconds
+            }
@@ -0,0 +1,28 @@
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnections:
+    """One SQLite connection per thread, reopened after a fork so workers never share a handle"""
+
+    def __init__(self, path, uri=False, wal=True, pragmas=(), check_same_thread=True):
+        self.path = path
+        self.uri = uri
+        self.wal = wal
+        self.pragmas = tuple(pragmas)
+        self.check_same_thread = check_same_thread
+        self._local = threading.local()
+
+    def get(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, uri=self.uri, check_same_thread=self.check_same_thread)
+            if self.wal:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+            for pragma in self.pragmas:
+                connection.execute(f"PRAGMA {pragma}")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
@@ -0,0 +1,143 @@
+import argparse
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Captured when the backend is first imported, so readiness reports true cold-start time
+PROCESS_START = time.monotonic()
+
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger'
+}
+
+
+class StartupState:
+    """Tracks the load phase of the backend and how long each phase took"""
+
+    def __init__(self):
+        self.phase = "not_started"
+        self.error = None
+        self.timings = {}
+        self.ready_after = None
+        self._phase_start = None
+        self._lock = threading.Lock()
+
+    def begin(self, phase):
+        """Enter a new load phase, closing the timer of the previous one"""
+        with self._lock:
+            self._close_phase()
+            self.phase = phase
+            self._phase_start = time.monotonic()
+        logger.info(f"Startup phase: {phase}")
+
+    def ready(self):
+        with self._lock:
+            self._close_phase()
+            self.phase = "ready"
+            self.ready_after = time.monotonic() - PROCESS_START
+        logger.info(f"Backend ready {self.ready_after:.2f}s after start ({self.timings})")
+
+    def fail(self, error):
+        with self._lock:
+            self._close_phase()
+            self.phase = "failed"
+            self.error = str(error)
+
+    @property
+    def is_ready(self):
+        return self.phase == "ready"
+
+    def _close_phase(self):
+        # Caller holds the lock
+        if self._phase_start is not None:
+            self.timings[self.phase] = round(time.monotonic() - self._phase_start, 3)
+            self._phase_start = None
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "phase": self.phase,
+                "ready": self.phase == "ready",
+                "error": self.error,
+                "timings": dict(self.timings),
+                "readyAfterSeconds": self.ready_after,
+                "uptimeSeconds": round(time.monotonic() - PROCESS_START, 3)
+            }
+
+
+def load_nltk_resources(data_dir=None, allow_download=False):
+    """Make the NLTK data the backend needs available and return the English stop words"""
+    import nltk
+
+    if data_dir and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+
+    def missing_resources():
+        missing = []
+        for name, path in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                missing.append(name)
+        return missing
+
+    missing = missing_resources()
+    if missing and allow_download:
+        logger.info(f"Downloading NLTK data: {', '.join(missing)}")
+        for name in missing:
+            nltk.download(name, download_dir=data_dir, quiet=True)
+        missing = missing_resources()
+    if missing:
+        raise LookupError(
+            f"Missing NLTK data: {', '.join(missing)}. "
+            f"Point NLTK_DATA_DIR at an offline bundle or set NLTK_ALLOW_DOWNLOAD=1"
+        )
+
+    from nltk.corpus import stopwords
+    return set(stopwords.words('english'))
+
+
+def model_load_kwargs(source):
+    """from_pretrained arguments for a Hugging Face id or a local checkpoint directory"""
+    if not os.path.isdir(source):
+        return {}
+    kwargs = {"local_files_only": True}
+    # safetensors weights are memory-mapped instead of unpickled
+    if os.path.exists(os.path.join(source, 'model.safetensors')):
+        kwargs["use_safetensors"] = True
+    return kwargs
+
+
+def build_offline_bundle(output_dir, model_name):
+    """Download the NLTK data and T5 checkpoint into a directory usable on air-gapped nodes"""
+    import nltk
+    from transformers import T5ForConditionalGeneration
+    from tokenization import load_tokenizer
+
+    nltk_dir = os.path.join(output_dir, 'nltk_data')
+    model_dir = os.path.join(output_dir, 't5')
+    os.makedirs(nltk_dir, exist_ok=True)
+    for name in NLTK_RESOURCES:
+        nltk.download(name, download_dir=nltk_dir, quiet=True)
+
+    # Saving the fast tokenizer writes tokenizer.json, so workers skip the sentencepiece conversion
+    load_tokenizer(model_name).save_pretrained(model_dir)
+    T5ForConditionalGeneration.from_pretrained(model_name).save_pretrained(model_dir, safe_serialization=True)
+
+    print(f"Offline bundle written to {output_dir}")
+    print(f"  NLTK_DATA_DIR={os.path.abspath(nltk_dir)}")
+    print(f"  T5_MODEL_DIR={os.path.abspath(model_dir)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prepare an offline bundle of NLTK data and T5 weights")
+    parser.add_argument('--output', required=True, help="directory to write the bundle to")
+    parser.add_argument('--model', default=os.environ.get('T5_MODEL_NAME', "iarfmoose/t5-base-question-generator"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    build_offline_bundle(args.output, args.model)
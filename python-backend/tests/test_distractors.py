@@ -0,0 +1,36 @@
+from distractors import DistractorEngine
+
+
+def overlaps(a, b):
+    a, b = a.lower(), b.lower()
+    return a in b or b in a
+
+
+def test_distractors_exclude_the_answer_and_overlapping_candidates():
+    engine = DistractorEngine(["heart", "heart muscle", "lungs", "kidney", "Liver", "liver"])
+    (distractors,) = engine.distractors_for(["heart"])
+
+    assert "heart" not in distractors and "heart muscle" not in distractors
+    assert sorted(distractors, key=str.lower) == ["kidney", "Liver", "lungs"]
+
+
+def test_distractors_of_one_question_are_not_near_copies_of_each_other():
+    engine = DistractorEngine([
+        "coronary artery", "coronary arteries", "Financial crisis", "crisis",
+        "plant", "plants", "blood vessel", "cardiac output"
+    ])
+    for answer in ["coronary vein", "crises", "planet", "artery wall"]:
+        (distractors,) = engine.distractors_for([answer])
+        for i, first in enumerate(distractors):
+            for second in distractors[i + 1:]:
+                assert not overlaps(first, second), (answer, distractors)
+
+
+def test_every_answer_gets_its_own_ranking_in_one_call():
+    engine = DistractorEngine(["plant", "plants", "planet", "animal", "fungus", "plant cell"])
+    results = engine.distractors_for(["plant", "animal"], count=2)
+
+    assert len(results) == 2
+    assert all(len(distractors) <= 2 for distractors in results)
+    assert not any(overlaps(d, "plant") for d in results[0])
+    assert "animal" not in results[1]
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+import jobs
+
+
+def fake_run_job_item(paragraph, question_count):
+    if paragraph == "bad":
+        raise ValueError("Paragraph should be at least 100 characters long")
+    return {"paragraph": paragraph, "questionCount": question_count}
+
+
+class SlowRecordStore(jobs.JobStore):
+    """Commits item outcomes late, as a busy SQLite file would"""
+
+    def record(self, job_id, index, quiz=None, error=None):
+        time.sleep(0.1)
+        super().record(job_id, index, quiz, error)
+
+
+@pytest.fixture
+def dispatcher(tmp_path, monkeypatch):
+    # Forked workers run the fake item function instead of loading T5
+    monkeypatch.setattr(jobs, 'init_job_worker', lambda torch_threads: None)
+    monkeypatch.setattr(jobs, 'run_job_item', fake_run_job_item)
+    path = str(tmp_path / 'jobs.sqlite3')
+    dispatcher = jobs.JobDispatcher(SlowRecordStore(path), workers=2, start_method='fork', poll_interval=0.02)
+    dispatcher.start()
+    yield jobs.JobStore(path)
+    dispatcher.stop()
+
+
+def wait_until_finished(store, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"Job {job_id} did not finish")
+
+
+def test_final_status_is_set_after_every_item_is_recorded(dispatcher):
+    job_id = dispatcher.create(["first", "bad", "third"], 3)
+    job = wait_until_finished(dispatcher, job_id)
+
+    assert job["status"] == "completed"
+    assert job["progress"] == {"total": 3, "completed": 2, "failed": 1, "percent": 100.0}
+    assert [result["index"] for result in job["results"]] == [0, 2]
+    assert job["errors"][0]["index"] == 1
+
+
+def test_job_with_one_late_success_is_not_failed(dispatcher):
+    job_id = dispatcher.create(["bad", "only success"], 1)
+    job = wait_until_finished(dispatcher, job_id)
+
+    assert job["status"] == "completed"
+    assert (job["progress"]["completed"], job["progress"]["failed"]) == (1, 1)
+
+
+def test_cancelled_job_dispatches_nothing_more(dispatcher):
+    job_id = dispatcher.create(["item"] * 20, 1)
+    dispatcher.cancel(job_id)
+    job = wait_until_finished(dispatcher, job_id)
+
+    assert job["status"] == "cancelled"
+    assert job["progress"]["completed"] + job["progress"]["failed"] < 20
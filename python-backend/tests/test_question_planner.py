@@ -0,0 +1,36 @@
+from nlp_backends import TaggedText
+from question_planner import AnswerPlanner, rank_noun_phrases
+from text_analysis import TextAnalysis
+
+STOP_WORDS = {'the', 'a', 'and', 'of', 'is', 'in'}
+
+
+def analysis_of(tagged_words):
+    tokens = [word for word, _ in tagged_words]
+    text = ' '.join(tokens)
+    return TextAnalysis(text, STOP_WORDS, tagged=TaggedText([text], tokens, list(tagged_words)))
+
+
+def test_phrases_rank_by_whole_phrase_occurrences():
+    analysis = analysis_of([
+        ('cell', 'NN'), ('membrane', 'NN'), ('is', 'VBZ'), ('thin', 'JJ'), ('.', '.'),
+        ('plant', 'NN'), ('cell', 'NN'), ('wall', 'NN'), ('is', 'VBZ'), ('rigid', 'JJ'), ('.', '.'),
+        ('the', 'DT'), ('cell', 'NN'), ('membrane', 'NN'), ('is', 'VBZ'), ('in', 'IN'),
+        ('the', 'DT'), ('cell', 'NN'), ('membrane', 'NN'), ('.', '.'),
+    ])
+
+    ranked = rank_noun_phrases(analysis)
+
+    assert ranked[0] == 'cell membrane'
+    assert set(ranked) == set(analysis.noun_phrases)
+
+
+def test_ranking_is_cached_on_the_analysis():
+    analysis = analysis_of([('solar', 'JJ'), ('panel', 'NN'), ('works', 'VBZ'), ('.', '.')])
+
+    AnswerPlanner(analysis)
+    ranked = analysis.ranked_noun_phrases
+    planner = AnswerPlanner(analysis)
+
+    assert analysis.ranked_noun_phrases is ranked
+    assert planner.take('phrase') == 'solar panel'
@@ -0,0 +1,46 @@
+import json
+import random
+
+from quiz_bank import QuizBank
+
+
+def question(text, answer):
+    return {"question": text, "correctAnswer": answer, "difficulty": "medium"}
+
+
+REPEATED = [
+    question("What is the powerhouse of the cell?", "mitochondria"),
+    question("What is the  powerhouse of the CELL?", "ATP"),
+    question("What controls the cell?", "nucleus"),
+    question("What surrounds the cell?", "membrane"),
+    question("What controls the cell?", "DNA"),
+]
+
+
+def test_bank_stores_each_question_text_once(tmp_path):
+    bank = QuizBank(str(tmp_path / "bank.sqlite3"))
+    bank.add("passage", "paragraph", "cells", REPEATED, passage_hash="passage")
+
+    assert bank.stats()["paragraphQuestions"] == 3
+    assert bank.sample_passage("passage", 4) is None
+    for seed in range(20):
+        questions, _ = bank.sample_passage("passage", 3, random.Random(seed))
+        texts = [' '.join(q["question"].lower().split()) for q in questions]
+        assert len(set(texts)) == 3
+
+
+def test_sampling_skips_repeats_already_in_the_bank(tmp_path):
+    bank = QuizBank(str(tmp_path / "bank.sqlite3"))
+    bank.add("keyword:cells:medium", "keyword", "cells", [])
+    # Rows written before add() deduplicated
+    connection = bank._connection()
+    with connection:
+        connection.executemany(
+            "INSERT INTO questions (source_key, kind, topic, difficulty, question) VALUES (?, 'keyword', 'cells', 'medium', ?)",
+            [("keyword:cells:medium", json.dumps(q)) for q in REPEATED]
+        )
+
+    assert bank.sample_keyword("Cells", "medium", 4) is None
+    for seed in range(20):
+        questions = bank.sample_keyword("Cells", "medium", 3, random.Random(seed))
+        assert len({' '.join(q["question"].lower().split()) for q in questions}) == 3
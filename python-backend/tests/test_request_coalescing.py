@@ -0,0 +1,162 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+from request_coalescing import CACHE_HIT, COALESCED, COMPUTED, RequestCoalescer, request_key
+
+
+def start_leader(coalescer, key, result="quiz"):
+    """Run a computation for `key` on another thread that blocks until the returned event is set"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(coalescer.run, key, compute)
+    executor.shutdown(wait=False)
+    assert started.wait(5)
+    return future, release
+
+
+def test_request_key_ignores_whitespace_but_not_options():
+    key = request_key("The water  cycle.\r\nRain falls. ", questionCount=5)
+    assert key == request_key("  The water cycle.\nRain falls.", questionCount=5)
+    assert key != request_key("The water cycle.\nRain falls.", questionCount=6)
+    assert key != request_key("The water cycle.\n\nRain falls.", questionCount=5)
+
+
+def test_finished_response_is_served_from_cache():
+    coalescer = RequestCoalescer(ttl_seconds=30)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"id": len(calls)}
+
+    assert coalescer.run("k", compute) == ({"id": 1}, COMPUTED)
+    assert coalescer.run("k", compute) == ({"id": 1}, CACHE_HIT)
+    assert coalescer.run("k", compute, use_cache=False) == ({"id": 2}, COMPUTED)
+    assert len(calls) == 2
+
+
+def test_cached_response_expires_after_ttl():
+    coalescer = RequestCoalescer(ttl_seconds=0.05)
+    coalescer.run("k", lambda: "first")
+    time.sleep(0.1)
+    assert coalescer.run("k", lambda: "second") == ("second", COMPUTED)
+
+
+def test_zero_ttl_only_coalesces():
+    coalescer = RequestCoalescer(ttl_seconds=0)
+    coalescer.run("k", lambda: "first")
+    assert coalescer.run("k", lambda: "second") == ("second", COMPUTED)
+    assert coalescer.stats()["cachedResponses"] == 0
+
+
+def test_cache_evicts_least_recently_used_entries():
+    coalescer = RequestCoalescer(ttl_seconds=30, max_entries=2)
+    for key in ("a", "b", "c"):
+        coalescer.run(key, lambda key=key: key)
+    assert coalescer.run("a", lambda: "recomputed") == ("recomputed", COMPUTED)
+    assert coalescer.run("c", lambda: "recomputed") == ("c", CACHE_HIT)
+
+
+def test_identical_requests_wait_on_one_computation():
+    coalescer = RequestCoalescer(ttl_seconds=30)
+    leader, release = start_leader(coalescer, "k")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        followers = [executor.submit(coalescer.run, "k", lambda: pytest.fail("followers must not compute")) for _ in range(3)]
+        time.sleep(0.05)
+        assert coalescer.stats()["inFlight"] == 1
+        release.set()
+        assert leader.result(5) == ("quiz", COMPUTED)
+        assert [follower.result(5) for follower in followers] == [("quiz", COALESCED)] * 3
+
+    stats = coalescer.stats()
+    assert (stats["computed"], stats["coalesced"], stats["inFlight"]) == (1, 3, 0)
+
+
+def test_leader_failure_reaches_followers_and_is_not_cached():
+    coalescer = RequestCoalescer(ttl_seconds=30)
+    leader, release = start_leader(coalescer, "k", result=ValueError("model failed"))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        follower = executor.submit(coalescer.run, "k", lambda: "unused")
+        time.sleep(0.05)
+        release.set()
+        with pytest.raises(ValueError):
+            leader.result(5)
+        with pytest.raises(ValueError):
+            follower.result(5)
+
+    assert coalescer.run("k", lambda: "retried") == ("retried", COMPUTED)
+
+
+def test_follower_gives_up_after_wait_timeout():
+    coalescer = RequestCoalescer(ttl_seconds=30, wait_timeout=0.05)
+    leader, release = start_leader(coalescer, "k")
+
+    with pytest.raises(FuturesTimeoutError):
+        coalescer.run("k", lambda: "unused")
+
+    release.set()
+    assert leader.result(5) == ("quiz", COMPUTED)
+    assert coalescer.stats()["coalesced"] == 0
+
+
+def test_followers_have_their_own_limit_outside_the_admission_queue():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_followers=1)
+    coalescer = RequestCoalescer(ttl_seconds=30)
+    leader, release = start_leader(coalescer, "k")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        follower = executor.submit(coalescer.run, "k", lambda: "unused", True, admission.follow)
+        time.sleep(0.05)
+        assert admission.stats()["following"] == 1
+
+        # The follower place is taken, but the queue place is still free for a distinct request
+        with pytest.raises(AdmissionRejected) as rejected:
+            coalescer.run("k", lambda: "unused", follow=admission.follow)
+        assert rejected.value.reason == "followers_full"
+        with admission.acquire():
+            queued = executor.submit(admission.acquire)
+            time.sleep(0.05)
+            assert admission.stats()["queued"] == 1
+        queued.result(5).release()
+
+        release.set()
+        assert follower.result(5) == ("quiz", COALESCED)
+
+    assert admission.stats()["following"] == 0
+    assert leader.result(5) == ("quiz", COMPUTED)
+
+
+def test_burst_of_identical_requests_is_not_rejected():
+    admission = AdmissionController(max_concurrent=2, max_queue=8)
+    coalescer = RequestCoalescer(ttl_seconds=0)
+    start = threading.Barrier(30)
+
+    def compute():
+        with admission.acquire():
+            time.sleep(0.2)
+            return "quiz"
+
+    def request():
+        start.wait(5)
+        return coalescer.run("k", compute, follow=admission.follow)
+
+    with ThreadPoolExecutor(max_workers=30) as executor:
+        results = [future.result(10) for future in [executor.submit(request) for _ in range(30)]]
+
+    assert {result for result, _ in results} == {"quiz"}
+    assert admission.stats()["rejected"] == {}
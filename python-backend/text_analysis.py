@@ -0,0 +1,221 @@
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from nlp_backends import NltkBackend
+
+WORD_POOL_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')
+WINDOW_WORD_PATTERN = re.compile(r'\w{3,}')
+
+# Used when no tagging is passed in, so TextAnalysis works before the configured backend is loaded
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def default_nlp_backend():
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = NltkBackend()
+        return _default_backend
+
+
+def content_hash(text):
+    """Stable hash of a paragraph used as the cache key"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TextAnalysis:
+    """Single-pass NLP analysis of a paragraph shared by every quiz generation stage"""
+
+    __slots__ = (
+        'content_hash',
+        'sentences',
+        'tokens',
+        'pos_tags',
+        'word_pool',
+        'word_pool_lower',
+        'entity_frequencies',
+        'key_entities',
+        'noun_phrases',
+        'avg_sentence_length',
+        'lexical_diversity',
+        'difficulty',
+        'windows',
+        '_word_windows',
+        '_window_lookup',
+        'distractor_engine',
+        'ranked_noun_phrases',
+    )
+
+    def __init__(self, text, stop_words, key_entity_count=15, window_words=200, window_overlap=1, tagged=None):
+        self.content_hash = content_hash(text)
+        # Sentences, tokens and Penn Treebank tags come from an NLP backend; everything below is backend independent
+        if tagged is None:
+            tagged = default_nlp_backend().tag_one(text)
+        self.sentences = tagged.sentences
+        self.tokens = tagged.tokens
+        self.pos_tags = tagged.pos_tags
+
+        # Words available to semantic distractors
+        self.word_pool = tuple(w for w in WORD_POOL_PATTERN.findall(text) if w.lower() not in stop_words)
+        self.word_pool_lower = tuple(w.lower() for w in self.word_pool)
+
+        # Nouns, verbs and adjectives ranked by frequency
+        important_words = [
+            word for word, pos in self.pos_tags
+            if (pos.startswith('NN') or pos.startswith('JJ') or pos.startswith('VB')) and
+            word.lower() not in stop_words and
+            len(word) > 2 and
+            word.isalpha()
+        ]
+        self.entity_frequencies = Counter(important_words)
+        self.key_entities = tuple(word for word, freq in self.entity_frequencies.most_common(key_entity_count))
+        self.noun_phrases = tuple(self._extract_noun_phrases(stop_words))
+
+        # Complexity metrics
+        alpha_words = [word.lower() for word in self.tokens if word.isalpha()]
+        self.avg_sentence_length = len(self.tokens) / len(self.sentences) if self.sentences else 0
+        self.lexical_diversity = len(set(alpha_words)) / len(alpha_words) if alpha_words else 0
+        if self.avg_sentence_length > 20 and self.lexical_diversity > 0.7:
+            self.difficulty = "hard"
+        elif self.avg_sentence_length > 15 and self.lexical_diversity > 0.5:
+            self.difficulty = "medium"
+        else:
+            self.difficulty = "easy"
+
+        # Overlapping sentence windows used as bounded generation contexts
+        self.windows = self._build_windows(text, window_words, window_overlap)
+        word_windows = {}
+        for i, window in enumerate(self.windows):
+            for word in set(WINDOW_WORD_PATTERN.findall(window.lower())):
+                word_windows.setdefault(word, []).append(i)
+        self._word_windows = word_windows
+        self._window_lookup = {}
+        for answer in self.key_entities + self.noun_phrases:
+            self.window_for(answer)
+
+        # Built on first use by the quiz generator and cached together with the analysis
+        self.distractor_engine = None
+        self.ranked_noun_phrases = None
+
+    def _extract_noun_phrases(self, stop_words):
+        # Look for adjective + noun or noun + noun patterns
+        pos_tags = self.pos_tags
+        noun_phrases = []
+        i = 0
+        while i < len(pos_tags):
+            phrase = []
+            while i < len(pos_tags) and (pos_tags[i][1].startswith('JJ') or pos_tags[i][1].startswith('NN')):
+                if pos_tags[i][0].lower() not in stop_words and pos_tags[i][0].isalpha():
+                    phrase.append(pos_tags[i][0])
+                i += 1
+            if len(phrase) >= 2:
+                noun_phrases.append(' '.join(phrase))
+            i += 1
+        return noun_phrases
+
+    def _build_windows(self, text, max_words, overlap):
+        # Greedily pack whole sentences up to max_words, repeating `overlap` sentences between windows
+        if max_words <= 0 or len(self.sentences) <= 1:
+            return (text,)
+        sentences = self.sentences
+        lengths = [len(sentence.split()) for sentence in sentences]
+        windows = []
+        start = 0
+        while start < len(sentences):
+            end = start
+            words = 0
+            while end < len(sentences) and (end == start or words + lengths[end] <= max_words):
+                words += lengths[end]
+                end += 1
+            windows.append(' '.join(sentences[start:end]))
+            if end >= len(sentences):
+                break
+            start = max(start + 1, end - overlap)
+        return tuple(windows)
+
+    def window_for(self, answer):
+        """Sentence window that best supports the given answer"""
+        window = self._window_lookup.get(answer)
+        if window is not None:
+            return window
+        if len(self.windows) == 1:
+            window = self.windows[0]
+        else:
+            # Prefer the window sharing most of the answer's words, then the one mentioning it most often
+            lowered = answer.lower()
+            scores = Counter()
+            for word in set(WINDOW_WORD_PATTERN.findall(lowered)):
+                scores.update(self._word_windows.get(word, ()))
+            if scores:
+                top = max(scores.values())
+                candidates = [i for i, score in scores.items() if score == top]
+                best = max(candidates, key=lambda i: (self.windows[i].lower().count(lowered), -i))
+                window = self.windows[best]
+            else:
+                window = self.windows[0]
+        self._window_lookup[answer] = window
+        return window
+
+    def words_excluding(self, answer):
+        """Word pool without occurrences of the given answer"""
+        answer = answer.lower()
+        return [word for word, lower in zip(self.word_pool, self.word_pool_lower) if lower != answer]
+
+
+class TextAnalysisCache:
+    """Bounded, thread-safe LRU of TextAnalysis objects keyed by content hash"""
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, build):
+        """Return the cached analysis for text, building it with build() on a miss"""
+        key = content_hash(text)
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return analysis
+            self.misses += 1
+
+        analysis = build()
+        self._store(key, analysis)
+        return analysis
+
+    def get_many(self, texts, build_many):
+        """Cached analyses for many texts, building all the misses with one build_many(missing_texts) call"""
+        keys = [content_hash(text) for text in texts]
+        results = {}
+        missing = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                analysis = self._entries.get(key)
+                if analysis is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results[key] = analysis
+                elif key not in missing:
+                    self.misses += 1
+                    missing[key] = text
+
+        if missing:
+            for key, analysis in zip(missing, build_many(list(missing.values()))):
+                results[key] = analysis
+                self._store(key, analysis)
+        return [results[key] for key in keys]
+
+    def _store(self, key, analysis):
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = analysis
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
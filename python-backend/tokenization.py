@@ -0,0 +1,93 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def load_tokenizer(model_name, **kwargs):
+    """Load the fast Rust T5 tokenizer when it can be built, otherwise the sentencepiece one"""
+    from transformers import T5Tokenizer, T5TokenizerFast
+    try:
+        return T5TokenizerFast.from_pretrained(model_name, **kwargs)
+    except Exception as e:
+        logger.warning(f"Fast tokenizer unavailable, using the slow T5Tokenizer: {str(e)}")
+        return T5Tokenizer.from_pretrained(model_name, **kwargs)
+
+
+class QuestionInputEncoder:
+    """Builds T5 inputs by splicing cached context prefix ids with per-answer suffix ids"""
+
+    def __init__(self, tokenizer, max_length=512, cache_size=256):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self._prefixes = OrderedDict()
+        self._suffixes = OrderedDict()
+        self._lock = threading.Lock()
+        self.prefix_hits = 0
+        self.prefix_misses = 0
+
+    def _encode_cached(self, cache, texts, render):
+        # Return ids for every text, encoding all cache misses in one batch call
+        ids = {}
+        missing = []
+        with self._lock:
+            for text in texts:
+                cached = cache.get(text)
+                if cached is not None:
+                    cache.move_to_end(text)
+                    ids[text] = cached
+                elif text not in ids:
+                    missing.append(text)
+                    ids[text] = None
+            if cache is self._prefixes:
+                self.prefix_hits += len(texts) - len(missing)
+                self.prefix_misses += len(missing)
+
+        if missing:
+            encoded = self.tokenizer([render(text) for text in missing], add_special_tokens=False)["input_ids"]
+            with self._lock:
+                for text, text_ids in zip(missing, encoded):
+                    ids[text] = text_ids
+                    cache[text] = text_ids
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+        return ids
+
+    def encode_ids(self, pairs):
+        """Token ids of "context: ... answer: ..." for each (context, answer) pair, truncating only the context"""
+        prefixes = self._encode_cached(self._prefixes, [context for context, _ in pairs], lambda context: f"context: {context}")
+        suffixes = self._encode_cached(self._suffixes, [answer for _, answer in pairs], lambda answer: f"answer: {answer}")
+        eos = [self.tokenizer.eos_token_id]
+
+        rows = []
+        for context, answer in pairs:
+            # The answer and end-of-sequence token always fit; the context gives up its tail
+            suffix = suffixes[answer][:self.max_length - 1]
+            prefix = prefixes[context][:max(0, self.max_length - len(suffix) - 1)]
+            rows.append(prefix + suffix + eos)
+        return rows
+
+    def encode_batch(self, pairs):
+        """Padded input_ids and attention_mask tensors for a batch of (context, answer) pairs"""
+        import torch
+
+        rows = self.encode_ids(pairs)
+        width = max(len(row) for row in rows)
+        pad = self.tokenizer.pad_token_id
+        input_ids = torch.full((len(rows), width), pad, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for i, row in enumerate(rows):
+            input_ids[i, :len(row)] = torch.tensor(row, dtype=torch.long)
+            attention_mask[i, :len(row)] = 1
+        return input_ids, attention_mask
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fastTokenizer": bool(getattr(self.tokenizer, 'is_fast', False)),
+                "prefixHits": self.prefix_hits,
+                "prefixMisses": self.prefix_misses,
+                "cachedPrefixes": len(self._prefixes)
+            }